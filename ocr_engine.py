@@ -4,32 +4,88 @@ OCR Engine Module for Qwen3-VL.
 This module handles the core OCR functionality:
 1. Lazy loading of the MLX model (Singleton pattern).
 2. Memory-safe image resizing (max 1024px).
-3. Deterministic text generation.
+3. Deterministic text generation on in-memory images (no JPEG round-trip).
 
 Interface:
     transcribe_image(image_source: Union[str, Path, Image.Image], temp_dir: Optional[Path] = None) -> str
+    transcribe_images_batch(images: List[Image.Image], temp_dir: Optional[Path] = None) -> List[Optional[str]]
 """
 
+import io
 import time
 import sys
+import tempfile
+from functools import lru_cache
 import mlx.core as mx
 from pathlib import Path
-from typing import Optional, Tuple, Union, Any
+from typing import List, Optional, Tuple, Union, Any
 from PIL import Image
 
-from mlx_vlm import load, generate
+from mlx_vlm import load, stream_generate
 from mlx_vlm.prompt_utils import apply_chat_template
 from mlx_vlm.utils import load_config
 
+# Optional: libjpeg-turbo SIMD encoder for the temp-file fallback path
+try:
+    import numpy as np
+    from turbojpeg import TurboJPEG, TJPF_RGB, TJSAMP_420
+    _TJ = TurboJPEG()
+except Exception:
+    _TJ = None
+
 # Configuration
 MODEL_PATH = "mlx-community/Qwen3-VL-8B-Instruct-4bit"
 MAX_IMAGE_DIM = 1024
-DEFAULT_PROMPT = "Transcribe the text in this image to Markdown format. Preserve the layout, prices, and structure as accurately as possible."
+MLX_CACHE_LIMIT_BYTES = 2 * 1024**3  # Cap on MLX's reusable buffer cache
+ACTIVATION_DTYPE = mx.bfloat16  # Dtype for the non-quantized (float) parameters; weights stay 4-bit
+END_MARKER = "<END>"
+DEFAULT_PROMPT = (
+    "Transcribe the text in this image to Markdown format. Preserve the layout, prices, and structure as accurately as possible. "
+    f"When the transcription is complete, output {END_MARKER}."
+)
+MAX_TOKENS_PER_IMAGE = 1024  # Most pages finish well below this; END_MARKER stops generation early
+TRUNCATED_RETRY_MAX_TOKENS = 2048  # Budget for one retry of an image that used up its budget before END_MARKER
+PAGE_SEPARATOR = "<<<PAGE_BREAK>>>"
+DEFAULT_BATCH_PROMPT = (
+    "You are given {num_images} page images in order. Transcribe the text of each page to Markdown format. "
+    "Preserve the layout, prices, and structure as accurately as possible. "
+    "After each page's transcription, output a line containing only {separator}. "
+    f"After the last page, output {END_MARKER}."
+)
+
+# Image modes converted to RGB before resizing
+_CONVERT_BEFORE_RESIZE = frozenset(("P", "RGBA"))
 
 # Singleton State
 _MODEL = None
 _PROCESSOR = None
 _CONFIG = None
+# How images are handed to mlx_vlm; downgraded at runtime if a form is rejected
+# ("pil" -> in-memory "bytes" JPEG -> on-disk "file" JPEG)
+_IMAGE_INPUT_MODES = ("pil", "bytes", "file")
+_IMAGE_INPUT_MODE = "pil"
+
+# Buffer-cache controls live on `mx` in newer MLX releases and on `mx.metal` in older ones
+_MX_CACHE = mx if hasattr(mx, "clear_cache") else getattr(mx, "metal", None)
+
+def _clear_mlx_cache() -> None:
+    """Returns MLX scratch buffers to the OS so memory stays flat across pages."""
+    if _MX_CACHE is not None:
+        _MX_CACHE.clear_cache()
+
+def _apply_activation_dtype() -> None:
+    """
+    Casts the model's floating-point parameters (embeddings, norms, quantization
+    scales) to ACTIVATION_DTYPE, halving activation bandwidth vs FP32 paths.
+    Quantized weights are integer arrays and are left untouched by set_dtype.
+    Falls back to the default precision if the cast is not supported.
+    """
+    try:
+        _MODEL.set_dtype(ACTIVATION_DTYPE)
+        mx.eval(_MODEL.parameters())
+        print(f"🔧 Activation dtype: {ACTIVATION_DTYPE}")
+    except Exception as e:
+        print(f"    ⚠️ Could not switch to {ACTIVATION_DTYPE} ({e}); keeping default precision")
 
 def _load_model_if_needed() -> None:
     """Lazy loads the model components if they are not already in memory."""
@@ -40,110 +96,304 @@ def _load_model_if_needed() -> None:
         try:
             _MODEL, _PROCESSOR = load(MODEL_PATH)
             _CONFIG = load_config(MODEL_PATH)
+            _apply_activation_dtype()
+            if _MX_CACHE is not None:
+                _MX_CACHE.set_cache_limit(MLX_CACHE_LIMIT_BYTES)
         except Exception as e:
             print(f"❌ Failed to load model: {e}")
             sys.exit(1)
 
+@lru_cache(maxsize=16)
+def _formatted_prompt(prompt: str, num_images: int) -> str:
+    """
+    Applies the chat template once per (prompt, num_images) pair.
+    Must be called after _load_model_if_needed() so _PROCESSOR/_CONFIG are set.
+    """
+    return apply_chat_template(_PROCESSOR, _CONFIG, prompt, num_images=num_images)
+
 def _resize_image_if_needed(image: Image.Image, max_dim: int = MAX_IMAGE_DIM) -> Image.Image:
     """
     Resizes PIL image if it exceeds max dimensions to prevent OOM.
     Returns the processed PIL Image object.
     """
     width, height = image.size
-    longest_side = max(width, height)
     
-    if longest_side > max_dim:
-        scale = max_dim / longest_side
-        new_size = (int(width * scale), int(height * scale))
-        print(f"    📉 Resizing {width}x{height} -> {new_size[0]}x{new_size[1]} (Memory Optimization)")
-        
-        # Handle modes that don't resize or save well (like P or RGBA if destined for JPEG)
-        if image.mode in ("P", "RGBA"):
-            image = image.convert("RGB")
-            
-        return image.resize(new_size, Image.Resampling.LANCZOS)
+    # Fast path: already within bounds (no max()/scale math needed)
+    if width <= max_dim and height <= max_dim:
+        return image
+    
+    scale = max_dim / (width if width >= height else height)
+    new_size = (int(width * scale), int(height * scale))
+    print(f"    📉 Resizing {width}x{height} -> {new_size[0]}x{new_size[1]} (Memory Optimization)")
     
+    # Handle modes that don't resize or save well (like P or RGBA if destined for JPEG).
+    # RGB (PyMuPDF pages, most JPEGs) is checked first and skips the set lookup.
+    if image.mode != "RGB" and image.mode in _CONVERT_BEFORE_RESIZE:
+        image = image.convert("RGB")
+        
+    # BILINEAR is plenty for OCR input; the VLM encoder resamples again anyway
+    return image.resize(new_size, Image.Resampling.BILINEAR)
+
+def _open_image_downscaled(path: Union[str, Path], max_dim: int = MAX_IMAGE_DIM) -> Image.Image:
+    """
+    Opens an image file already shrunk to fit within max_dim.
+    For JPEGs, draft() lets libjpeg decode at a reduced DCT scale, and
+    thumbnail() finishes the downscale in place on the smaller buffer.
+    """
+    image = Image.open(path)
+    width, height = image.size
+    if max(width, height) <= max_dim:
+        return image
+
+    image.draft("RGB", (max_dim, max_dim))
+    if image.mode != "RGB" and image.mode in _CONVERT_BEFORE_RESIZE:
+        image = image.convert("RGB")
+    image.thumbnail((max_dim, max_dim), Image.Resampling.BILINEAR)
+    print(f"    📉 Resizing {width}x{height} -> {image.width}x{image.height} (Memory Optimization)")
     return image
 
+def _write_jpeg(image: Image.Image, file_obj: Any) -> None:
+    """Encodes an RGB image as a cheap JPEG, using PyTurboJPEG when available."""
+    if _TJ is not None:
+        file_obj.write(_TJ.encode(np.asarray(image), quality=85, pixel_format=TJPF_RGB, jpeg_subsample=TJSAMP_420))
+    else:
+        image.save(file_obj, "JPEG", quality=85, optimize=False, subsampling=2)
+
+class _ImageInputRejected(Exception):
+    """Generation failed before the first token with an error typical of an unsupported image form."""
+
+def _stream_until_done(formatted_prompt: str, image_arg: List[Any], max_tokens: int) -> Tuple[str, bool]:
+    """
+    Streams tokens and stops as soon as the model emits END_MARKER.
+    Returns (text, truncated): truncated is True if the token budget ran out before END_MARKER.
+    A TypeError/AttributeError before the first token is raised as _ImageInputRejected.
+    """
+    # Collect chunks in a list and only search the new chunk plus the few characters
+    # before it (a marker may span chunks), so each step costs O(chunk), not O(text)
+    chunks = []
+    tail = ""
+    try:
+        for chunk in stream_generate(
+            _MODEL,
+            _PROCESSOR,
+            formatted_prompt,
+            image=image_arg,
+            max_tokens=max_tokens,
+            temperature=0.0
+        ):
+            piece = getattr(chunk, "text", chunk)
+            chunks.append(piece)
+            window = tail + piece
+            if END_MARKER in window:
+                return "".join(chunks).split(END_MARKER, 1)[0].rstrip(), False
+            tail = window[-(len(END_MARKER) - 1):]
+    except (TypeError, AttributeError) as e:
+        # Images are loaded before the first token; a failure mid-stream comes from the model itself
+        if chunks:
+            raise
+        raise _ImageInputRejected(e) from e
+    # stream_generate yields one chunk per token: a full budget means the page was cut off,
+    # fewer chunks mean the model stopped on its own (EOS) without the marker
+    return "".join(chunks).rstrip(), len(chunks) >= max_tokens
+
+def _encode_jpeg_in_memory(image: Image.Image) -> io.BytesIO:
+    """Encodes an image into an in-memory JPEG buffer (no disk I/O)."""
+    buffer = io.BytesIO()
+    _write_jpeg(image, buffer)
+    buffer.seek(0)
+    return buffer
+
+def _generate_in_mode(
+    mode: str,
+    formatted_prompt: str,
+    images: List[Image.Image],
+    temp_dir: Optional[Path],
+    max_tokens: int
+) -> Tuple[str, bool]:
+    """Runs generation with the images passed as PIL images, JPEG buffers or temp JPEG files."""
+    if mode != "file":
+        image_arg = images if mode == "pil" else [_encode_jpeg_in_memory(img) for img in images]
+        return _stream_until_done(formatted_prompt, image_arg, max_tokens)
+
+    temp_paths = []
+    try:
+        for image in images:
+            with tempfile.NamedTemporaryFile(prefix="ocr_temp_", suffix=".jpg", dir=temp_dir, delete=False) as temp_file:
+                temp_paths.append(Path(temp_file.name))
+                _write_jpeg(image, temp_file)
+        return _stream_until_done(formatted_prompt, [str(p) for p in temp_paths], max_tokens)
+    finally:
+        for temp_path in temp_paths:
+            try:
+                temp_path.unlink()
+            except OSError:
+                pass
+
+def _generate_with_fallback(
+    formatted_prompt: str,
+    images: List[Image.Image],
+    temp_dir: Optional[Path],
+    max_tokens: int = MAX_TOKENS_PER_IMAGE
+) -> Tuple[str, bool]:
+    """
+    Runs generation and returns (text, truncated), passing images in the cheapest form
+    the installed mlx_vlm accepts: PIL images, then in-memory JPEG buffers,
+    then temp JPEG files as a last resort. Only errors raised before the first
+    token count as a rejected form, so a failure inside the model is never
+    rerun. A form is only remembered for later calls once it has worked where
+    the cheaper ones failed; if every form fails, the first error is raised.
+    """
+    global _IMAGE_INPUT_MODE
+
+    first_error = None
+    for mode in _IMAGE_INPUT_MODES[_IMAGE_INPUT_MODES.index(_IMAGE_INPUT_MODE):]:
+        try:
+            result = _generate_in_mode(mode, formatted_prompt, images, temp_dir, max_tokens)
+        except _ImageInputRejected as e:
+            first_error = first_error or e.__cause__
+            if mode != _IMAGE_INPUT_MODES[-1]:
+                print(f"    ℹ️ mlx_vlm rejected '{mode}' image input ({e.__cause__}); trying the next fallback")
+            continue
+        if first_error is not None:
+            _IMAGE_INPUT_MODE = mode
+        return result
+
+    raise first_error
+
+def _prepare_image(image_source: Union[str, Path, Image.Image], pre_sized: bool = False) -> Tuple[Image.Image, str]:
+    """Loads, resizes and converts an image source to RGB. Returns (image, display_name)."""
+    if isinstance(image_source, (str, Path)):
+        original_name = Path(image_source).name
+        processed_img = Image.open(image_source) if pre_sized else _open_image_downscaled(image_source)
+    else:
+        original_name = "in_memory_image"
+        processed_img = image_source if pre_sized else _resize_image_if_needed(image_source)
+
+    # The image is passed to MLX in memory, but keep it in a plain RGB mode
+    if processed_img.mode != "RGB":
+        processed_img = processed_img.convert("RGB")
+
+    return processed_img, original_name
+
+def _print_stats(text: str, duration: float) -> None:
+    """Prints a rough throughput line for one generate() call."""
+    char_count = len(text)
+    tps = (char_count / 4) / duration if duration > 0 else 0
+    print(f"    ⚡️ Generated {char_count} chars in {duration:.2f}s (~{tps:.1f} TPS)")
+
 def transcribe_image(
     image_source: Union[str, Path, Image.Image],
-    temp_dir: Path,
-    prompt: str = DEFAULT_PROMPT
+    temp_dir: Optional[Path] = None,
+    prompt: str = DEFAULT_PROMPT,
+    pre_sized: bool = False,
+    max_tokens: int = MAX_TOKENS_PER_IMAGE
 ) -> Optional[str]:
     """
     Main entry point for OCR.
     
     Args:
         image_source: File path (str/Path) or PIL Image object.
-        temp_dir: Directory to save intermediate resized file (required by MLX API).
+        temp_dir: Directory for intermediate files, only used when the installed
+            mlx_vlm cannot take in-memory images.
         prompt: The instruction for the model.
+        pre_sized: True if the image was already rendered within MAX_IMAGE_DIM
+            (e.g. PDF pages), which skips the resize step.
+        max_tokens: Generation budget; the model usually stops earlier at END_MARKER.
+            An image that uses it all is retried once with TRUNCATED_RETRY_MAX_TOKENS.
         
     Returns:
         The transcribed text or None if failed.
     """
     _load_model_if_needed()
     
-    temp_file_path = None
-    
     try:
-        # 1. Load and Standardize Image
-        if isinstance(image_source, (str, Path)):
-            img = Image.open(image_source)
-            original_name = Path(image_source).name
-        else:
-            img = image_source
-            original_name = "in_memory_image"
+        # 1. Load, resize and standardize image
+        processed_img, original_name = _prepare_image(image_source, pre_sized)
 
-        # 2. Resize/Safe-guard
-        processed_img = _resize_image_if_needed(img)
-        
-        # 3. Save to temp file (MLX generate expects a file path)
-        # We assume processed_img is ready to be saved as JPEG
-        if processed_img.mode != "RGB":
-            processed_img = processed_img.convert("RGB")
-            
-        temp_file_path = temp_dir / f"ocr_temp_{int(time.time()*1000)}.jpg"
-        processed_img.save(temp_file_path)
-
-        # 4. Prepare Prompt
-        formatted_prompt = apply_chat_template(
-            _PROCESSOR, 
-            _CONFIG, 
-            prompt, 
-            num_images=1
-        )
+        # 2. Prepare Prompt (cached per prompt/image count)
+        formatted_prompt = _formatted_prompt(prompt, 1)
         
-        # 5. Generate
+        # 3. Generate
         t_start = time.time()
-        
-        output = generate(
-            _MODEL,
-            _PROCESSOR,
-            formatted_prompt,
-            image=[str(temp_file_path)],
-            verbose=False,
-            max_tokens=2048,
-            temperature=0.0
-        )
-        
+        text, truncated = _generate_with_fallback(formatted_prompt, [processed_img], temp_dir, max_tokens)
+        if truncated and max_tokens < TRUNCATED_RETRY_MAX_TOKENS:
+            print(f"    ⚠️ {original_name} used all {max_tokens} tokens before {END_MARKER}; "
+                  f"retrying with {TRUNCATED_RETRY_MAX_TOKENS}")
+            max_tokens = TRUNCATED_RETRY_MAX_TOKENS
+            text, truncated = _generate_with_fallback(formatted_prompt, [processed_img], temp_dir, max_tokens)
+        if truncated:
+            print(f"    ⚠️ {original_name} is likely truncated: no {END_MARKER} within {max_tokens} tokens")
         duration = time.time() - t_start
-        text = output.text
-        
-        # Stats
-        char_count = len(text)
-        tps = (char_count / 4) / duration if duration > 0 else 0
-        print(f"    ⚡️ Generated {char_count} chars in {duration:.2f}s (~{tps:.1f} TPS)")
+
+        _print_stats(text, duration)
         
         return text
 
     except Exception as e:
         print(f"    ❌ Error processing {original_name if 'original_name' in locals() else 'image'}: {e}")
         return None
-        
+
     finally:
-        # Cleanup specific temp file for this inference
-        if temp_file_path and temp_file_path.exists():
-            try:
-                temp_file_path.unlink()
-            except OSError:
-                pass
+        # Output text is already materialized; drop the scratch buffers
+        _clear_mlx_cache()
+
+def transcribe_images_batch(
+    images: List[Image.Image],
+    temp_dir: Optional[Path] = None,
+    prompt: str = DEFAULT_BATCH_PROMPT,
+    pre_sized: bool = False,
+    max_tokens: int = MAX_TOKENS_PER_IMAGE
+) -> List[Optional[str]]:
+    """
+    OCRs several images (e.g. consecutive PDF pages) in a single generate() pass.
+
+    The model is asked to separate pages with PAGE_SEPARATOR. If the output
+    cannot be split into exactly one chunk per image, the batch is redone
+    image-by-image with transcribe_image. `max_tokens` is the budget per image.
+
+    Returns:
+        One transcription (or None) per input image, in order.
+    """
+    if not images:
+        return []
+    if len(images) == 1:
+        return [transcribe_image(images[0], temp_dir, pre_sized=pre_sized, max_tokens=max_tokens)]
+
+    _load_model_if_needed()
+
+    try:
+        processed = [_prepare_image(img, pre_sized)[0] for img in images]
+
+        formatted_prompt = _formatted_prompt(
+            prompt.format(num_images=len(processed), separator=PAGE_SEPARATOR),
+            len(processed)
+        )
+
+        t_start = time.time()
+        text, truncated = _generate_with_fallback(
+            formatted_prompt,
+            processed,
+            temp_dir,
+            max_tokens=max_tokens * len(processed)
+        )
+        duration = time.time() - t_start
+        _print_stats(text, duration)
+
+        chunks = [chunk.strip() for chunk in text.split(PAGE_SEPARATOR)]
+        if chunks and not chunks[-1]:
+            chunks.pop()
+        if truncated:
+            # The last page(s) were cut off at the budget; per-image runs warn and retry as needed
+            print(f"    ⚠️ Batch used all {max_tokens * len(processed)} tokens before {END_MARKER}; retrying one by one")
+        elif len(chunks) == len(processed):
+            return chunks
+        else:
+            print(f"    ⚠️ Batch output had {len(chunks)} sections for {len(processed)} images; retrying one by one")
+
+    except Exception as e:
+        print(f"    ❌ Error processing batch of {len(images)} images: {e}")
+
+    finally:
+        _clear_mlx_cache()
+
+    return [transcribe_image(img, temp_dir, pre_sized=pre_sized, max_tokens=max_tokens) for img in images]
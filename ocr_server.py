@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Long-lived OCR worker for the Local OCR Pipeline.
+
+Keeps the MLX model resident in memory and serves OCR jobs over a local
+multiprocessing connection, so repeated runs of process_images_mlx_v3.py
+skip the model cold-start.
+
+Usage:
+    python3 ocr_server.py              # start once, leave running
+    python3 process_images_mlx_v3.py   # uses the server if it is reachable
+
+The server listens on a Unix socket inside a private (0700) per-user
+directory and authenticates clients with a random key generated on first
+start and kept next to it in a 0600 file. Set OCR_SERVER_AUTHKEY to use a
+key of your own instead.
+
+Clients only need this module's standard-library imports: ocr_engine (and
+with it MLX) is imported by serve(), or by a client that loses its server
+mid-run and carries on in-process.
+
+Interface:
+    connect() -> Optional[RemoteOCREngine]
+"""
+
+import os
+import secrets
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Suppress HuggingFace Tokenizers parallelism warning
+os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+# Configuration
+RUNTIME_DIR = Path(os.environ.get("OCR_SERVER_DIR", Path.home() / ".cache" / "local_ocr"))
+SERVER_ADDRESS = str(RUNTIME_DIR / "ocr_server.sock")
+AUTHKEY_PATH = RUNTIME_DIR / "authkey"
+AUTHKEY_ENV = "OCR_SERVER_AUTHKEY"
+
+def _allowed_methods() -> Dict[str, Callable[..., Any]]:
+    """Calls the server is willing to run on behalf of a client (imports ocr_engine, so server-side only)."""
+    import ocr_engine
+    return {
+        "max_image_dim": lambda: ocr_engine.MAX_IMAGE_DIM,
+        "transcribe_image": ocr_engine.transcribe_image,
+        "transcribe_images_batch": ocr_engine.transcribe_images_batch,
+    }
+
+class RemoteOCREngine:
+    """
+    Client stub exposing the same OCR calls as ocr_engine,
+    forwarded to a running ocr_server.
+
+    Failures are contained like in ocr_engine: a job that fails on the server
+    yields None for its images, and if the server goes away mid-run the stub
+    loads the model in-process and carries on with it.
+    """
+
+    def __init__(self, conn: Connection, max_image_dim: int):
+        self._conn = conn
+        self._local = None  # ocr_engine, once the server has been lost
+        self.MAX_IMAGE_DIM = max_image_dim
+
+    def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        """Sends one request and blocks for its result. Returns None if the job failed on the server."""
+        if self._local is not None:
+            return getattr(self._local, method)(*args, **kwargs)
+        try:
+            self._conn.send((method, args, kwargs))
+            result, error = self._conn.recv()
+        except (EOFError, OSError) as e:
+            print(f"    ⚠️ Lost the OCR server ({type(e).__name__}); loading the model in-process")
+            self.close()
+            import ocr_engine
+            self._local = ocr_engine
+            return getattr(ocr_engine, method)(*args, **kwargs)
+        if error is not None:
+            print(f"    ❌ OCR server failed {method}: {error}")
+            return None
+        return result
+
+    def transcribe_image(self, image_source: Any, *args: Any, **kwargs: Any) -> Optional[str]:
+        """See ocr_engine.transcribe_image. File paths are sent absolute: the server has its own cwd."""
+        if isinstance(image_source, (str, Path)):
+            image_source = Path(image_source).resolve()
+        return self._call("transcribe_image", image_source, *args, **kwargs)
+
+    def transcribe_images_batch(self, images: List[Any], *args: Any, **kwargs: Any) -> List[Optional[str]]:
+        """See ocr_engine.transcribe_images_batch."""
+        results = self._call("transcribe_images_batch", images, *args, **kwargs)
+        return [None] * len(images) if results is None else results
+
+    def close(self) -> None:
+        """Closes the connection to the server."""
+        self._conn.close()
+
+def _ensure_runtime_dir() -> None:
+    """Creates RUNTIME_DIR if needed and makes sure only the current user can enter it."""
+    RUNTIME_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+    os.chmod(RUNTIME_DIR, 0o700)
+
+def _load_authkey(create: bool = False) -> Optional[bytes]:
+    """
+    Returns the shared auth key: OCR_SERVER_AUTHKEY if it is set, otherwise the
+    contents of AUTHKEY_PATH. With create=True (the server) a random key is
+    written there (mode 0600) on first start.
+    """
+    env_key = os.environ.get(AUTHKEY_ENV)
+    if env_key:
+        return env_key.encode()
+
+    try:
+        return AUTHKEY_PATH.read_bytes()
+    except FileNotFoundError:
+        if not create:
+            return None
+
+    key = secrets.token_hex(32).encode()
+    try:
+        fd = os.open(AUTHKEY_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return AUTHKEY_PATH.read_bytes()  # Another server start won the race
+    with os.fdopen(fd, "wb") as key_file:
+        key_file.write(key)
+    return key
+
+def connect() -> Optional[RemoteOCREngine]:
+    """Returns a client for a running OCR server, or None if none is reachable."""
+    authkey = _load_authkey()
+    if authkey is None or not os.path.exists(SERVER_ADDRESS):
+        return None
+    try:
+        conn = Client(SERVER_ADDRESS, family="AF_UNIX", authkey=authkey)
+    except (OSError, EOFError, AuthenticationError):
+        return None
+    try:
+        conn.send(("max_image_dim", (), {}))
+        max_image_dim, error = conn.recv()
+    except (OSError, EOFError):
+        conn.close()
+        return None
+    if error is not None:
+        conn.close()
+        return None
+    print(f"🔌 Connected to OCR server at {SERVER_ADDRESS}")
+    return RemoteOCREngine(conn, max_image_dim)
+
+def _handle_client(conn: Connection, methods: Dict[str, Callable[..., Any]]) -> None:
+    """Serves requests for `methods` from one client until it disconnects."""
+    while True:
+        try:
+            method, args, kwargs = conn.recv()
+        except (EOFError, OSError):
+            return
+
+        # Replies are (result, None) or (None, error message): a failing job must not take the server down
+        func = methods.get(method)
+        if func is None:
+            print(f"    ⚠️ Rejected unknown method: {method}")
+            reply = (None, f"unknown method {method!r}")
+        else:
+            try:
+                reply = (func(*args, **kwargs), None)
+            except Exception as e:
+                print(f"    ❌ {method} failed: {e}")
+                reply = (None, f"{type(e).__name__}: {e}")
+
+        try:
+            conn.send(reply)
+        except (EOFError, OSError):
+            return  # Client went away mid-job (e.g. Ctrl-C during a long PDF)
+        except Exception as e:
+            # The result itself could not be pickled; the connection is still usable
+            try:
+                conn.send((None, f"could not send result: {e}"))
+            except (EOFError, OSError):
+                return
+
+def serve() -> None:
+    """Loads the model once and serves clients sequentially, forever."""
+    _ensure_runtime_dir()
+    authkey = _load_authkey(create=True)
+
+    if os.path.exists(SERVER_ADDRESS):
+        existing = connect()
+        if existing is not None:
+            existing.close()
+            print(f"⚠️ An OCR server is already listening on {SERVER_ADDRESS}")
+            return
+        os.unlink(SERVER_ADDRESS)  # Stale socket left by a server that did not shut down cleanly
+
+    import ocr_engine
+    methods = _allowed_methods()
+    ocr_engine._load_model_if_needed()
+
+    with Listener(SERVER_ADDRESS, family="AF_UNIX", authkey=authkey) as listener:
+        print(f"🟢 OCR server listening on {SERVER_ADDRESS}")
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                print(f"    ⚠️ Failed to accept connection: {e}")
+                continue
+
+            with conn:
+                print(f"🔌 Client connected")
+                _handle_client(conn, methods)
+                print(f"👋 Client disconnected")
+
+if __name__ == "__main__":
+    try:
+        serve()
+    except KeyboardInterrupt:
+        print(f"\n🛑 OCR server stopped.")
@@ -2,45 +2,177 @@
 PDF Processing Utilities.
 
 Handles breaking down PDFs into individual page images for processing.
+Pages are rendered with PyMuPDF from a single open document handle.
 """
 
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Executor
 from pathlib import Path
 from typing import Iterator, Tuple, Optional
 from PIL import Image
-from pdf2image import convert_from_path, pdfinfo_from_path
+import pymupdf
+
+# Render resolution for PDF pages
+RENDER_DPI = 150
+
+# In a render worker process: the document it last opened, reused for the following pages
+_WORKER_DOC: Optional[Tuple[str, "pymupdf.Document"]] = None
 
 def count_pdf_pages(file_path: Path) -> int:
     """Returns the number of pages in a PDF safely."""
     try:
-        info = pdfinfo_from_path(file_path)
-        return info["Pages"]
+        with pymupdf.open(file_path) as doc:
+            return doc.page_count
     except Exception as e:
         print(f"    ⚠️ Could not read PDF info for {file_path.name}: {e}")
         return 0
 
-def extract_pdf_pages(file_path: Path) -> Iterator[Tuple[int, Image.Image]]:
+def _page_matrix(page: "pymupdf.Page", max_dim: Optional[int]) -> "pymupdf.Matrix":
+    """Returns a render matrix so the page's longest side is at most max_dim pixels."""
+    scale = RENDER_DPI / 72
+    if max_dim:
+        longest_side = max(page.rect.width, page.rect.height)
+        if longest_side > 0:
+            scale = min(scale, max_dim / longest_side)
+    return pymupdf.Matrix(scale, scale)
+
+def extract_pdf_pages(file_path: Path, max_dim: Optional[int] = None) -> Iterator[Tuple[int, Image.Image]]:
     """
     Yields (page_number, PIL.Image) for each page in the PDF.
-    
-    Processing is done lazily page-by-page to conserve memory.
+
+    The document is opened once and rendered lazily page-by-page to conserve memory.
+    If max_dim is given, pages are rasterized directly at that size instead of
+    being rendered at RENDER_DPI and downscaled afterwards.
+    """
+    try:
+        doc = pymupdf.open(file_path)
+    except Exception as e:
+        print(f"    ⚠️ Could not open PDF {file_path.name}: {e}")
+        return
+
+    try:
+        num_pages = doc.page_count
+        if num_pages == 0:
+            return
+
+        print(f"  • Found {num_pages} pages.")
+
+        for i, page in enumerate(doc, 1):
+            print(f"  • Processing Page {i}/{num_pages}...")
+            try:
+                pix = page.get_pixmap(matrix=_page_matrix(page, max_dim), colorspace=pymupdf.csRGB, alpha=False)
+                img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+                pix = None
+                yield i, img
+
+            except Exception as e:
+                print(f"    ❌ Error extracting page {i}: {e}")
+    finally:
+        doc.close()
+
+def _render_page(file_path: Path, page_index: int, max_dim: Optional[int]) -> Tuple[int, bytes, int, int]:
+    """
+    Renders one page in a worker process. Returns (page_index, rgb_bytes, width, height).
+    Top-level so it can be pickled by ProcessPoolExecutor; it only needs pymupdf.
+    The worker keeps the document open between calls instead of reopening it per page.
+    """
+    global _WORKER_DOC
+    key = str(file_path)
+    if _WORKER_DOC is None or _WORKER_DOC[0] != key:
+        if _WORKER_DOC is not None:
+            _WORKER_DOC[1].close()
+        _WORKER_DOC = (key, pymupdf.open(file_path))
+    page = _WORKER_DOC[1][page_index]
+    pix = page.get_pixmap(matrix=_page_matrix(page, max_dim), colorspace=pymupdf.csRGB, alpha=False)
+    return page_index, pix.samples, pix.width, pix.height
+
+def extract_pdf_pages_parallel(
+    file_path: Path,
+    executor: Executor,
+    workers: int,
+    max_dim: Optional[int] = None
+) -> Iterator[Tuple[int, Image.Image]]:
+    """
+    Same as extract_pdf_pages, but renders pages concurrently on `executor`,
+    a process pool of `workers` processes shared by the whole run.
+
+    Pages are still yielded in order, and at most 2 * workers rendered pages
+    are in flight at any time to bound memory.
     """
     num_pages = count_pdf_pages(file_path)
-    if num_pages == 0:
+    if workers <= 1 or num_pages <= 1:
+        yield from extract_pdf_pages(file_path, max_dim=max_dim)
         return
 
-    print(f"  • Found {num_pages} pages.")
+    print(f"  • Found {num_pages} pages. Rendering with {workers} processes.")
+
+    pending = deque()
+    next_index = 0
+    try:
+        while pending or next_index < num_pages:
+            while next_index < num_pages and len(pending) < 2 * workers:
+                pending.append((next_index + 1, executor.submit(_render_page, file_path, next_index, max_dim)))
+                next_index += 1
+
+            page_num, future = pending.popleft()
+            print(f"  • Processing Page {page_num}/{num_pages}...")
+            try:
+                _, samples, width, height = future.result()
+            except Exception as e:
+                print(f"    ❌ Error extracting page {page_num}: {e}")
+                continue
+
+            yield page_num, Image.frombytes("RGB", (width, height), samples)
+    finally:
+        # The pool outlives this PDF: drop pages nobody will consume
+        for _, future in pending:
+            future.cancel()
 
-    for i in range(1, num_pages + 1):
-        print(f"  • Processing Page {i}/{num_pages}...")
+def prefetch_pages(
+    file_path: Path,
+    max_dim: Optional[int] = None,
+    maxsize: int = 2,
+    executor: Optional[Executor] = None,
+    workers: int = 1
+) -> Iterator[Tuple[int, Image.Image]]:
+    """
+    Same as extract_pdf_pages, but rasterizes ahead in a background thread.
+
+    Up to `maxsize` rendered pages are buffered so rendering page N+1 overlaps
+    with OCR on page N (PyMuPDF releases the GIL while rendering). With an
+    `executor` of workers > 1 processes the pages are rendered by
+    extract_pdf_pages_parallel.
+    """
+    page_queue: "queue.Queue[Optional[Tuple[int, Image.Image]]]" = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def _put(item: Optional[Tuple[int, Image.Image]]) -> bool:
+        # Block on a full queue, but give up if the consumer went away
+        while not stop.is_set():
+            try:
+                page_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _producer() -> None:
         try:
-            # Convert single page
-            # fmt='jpeg' reduces memory vs ppm internally in pdf2image
-            pages = convert_from_path(file_path, first_page=i, last_page=i, fmt='jpeg')
-            
-            if pages:
-                yield i, pages[0]
+            if executor is not None and workers > 1:
+                pages = extract_pdf_pages_parallel(file_path, executor, workers, max_dim=max_dim)
             else:
-                print(f"    ⚠️ Failed to extract page {i}")
-                
-        except Exception as e:
-            print(f"    ❌ Error extracting page {i}: {e}")
+                pages = extract_pdf_pages(file_path, max_dim=max_dim)
+            for item in pages:
+                if not _put(item):
+                    return
+        finally:
+            _put(None)  # Sentinel: no more pages
+
+    worker = threading.Thread(target=_producer, name=f"pdf-prefetch-{file_path.name}", daemon=True)
+    worker.start()
+    try:
+        yield from iter(page_queue.get, None)
+    finally:
+        stop.set()
@@ -6,57 +6,121 @@ Orchestrates file scanning, PDF extraction, and OCR processing using modular com
 
 import sys
 import os
+import argparse
+import gc
+import itertools
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Any, List, Optional
 
 # Suppress HuggingFace Tokenizers parallelism warning
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
 # Import our new modules
-import ocr_engine
+# (ocr_engine pulls in MLX and is imported in main() only when no OCR server is
+# running, so clients of a warm server and spawned PDF render workers stay light)
+import ocr_server
 import pdf_processor
 
 # Constants
 IMAGE_DIR = Path("poc_images")
+PDF_BATCH_SIZE = 4  # Pages per generate() call for PDFs
+SUPPORTED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".pdf"}
+GC_EVERY_N_PAGES = 20  # Force a GC pass periodically on long PDFs
+PDF_RENDER_WORKERS = 1  # Processes rasterizing PDF pages; prefetch already overlaps rendering with OCR
 
 def get_files_to_process(directory: Path) -> List[Path]:
-    """Get all JPEG/PNG/PDF files from directory."""
-    patterns = ["*.jpg", "*.jpeg", "*.png", "*.JPG", "*.PNG", "*.pdf", "*.PDF"]
-    files = []
-    for pattern in patterns:
-        files.extend(directory.glob(pattern))
+    """Get all JPEG/PNG/PDF files from directory (single pass, case-insensitive)."""
+    with os.scandir(directory) as entries:
+        files = {
+            Path(entry.path) for entry in entries
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS
+        }
     
     return sorted(files)
 
-def process_file_item(file_path: Path, temp_dir: Path) -> None:
-    """Dispatches processing for a single file (Image or PDF)."""
+def is_up_to_date(file_path: Path, output_path: Path) -> bool:
+    """True if output_path exists and is at least as new as file_path."""
+    try:
+        return output_path.stat().st_mtime >= file_path.stat().st_mtime
+    except FileNotFoundError:
+        return False
+
+def process_file_item(
+    file_path: Path,
+    temp_dir: Path,
+    engine: Any,
+    force: bool = False,
+    render_pool: Optional[ProcessPoolExecutor] = None,
+    render_workers: int = 1
+) -> None:
+    """
+    Dispatches processing for a single file (Image or PDF).
+
+    `engine` is either the in-process ocr_engine module or a client for a
+    running ocr_server (same interface). Files whose output is already newer
+    than the input are skipped unless `force` is set. `render_pool` is the
+    run-wide process pool of `render_workers` processes for PDF pages, if any.
+    """
     
     output_path = file_path.with_suffix(".mlx.txt")
     
+    if not force and is_up_to_date(file_path, output_path):
+        print(f"⏭️ Skipping {file_path.name} (up to date: {output_path.name})\n")
+        return
+    
     # --- PDF Processing ---
     if file_path.suffix.lower() == '.pdf':
         print(f"📄 Processing PDF: {file_path.name}...")
         
-        full_text = []
+        pages_written = 0
+        
+        # Iterate over pages yielded by the helper, PDF_BATCH_SIZE pages at a time
+        # Pages are rasterized directly at the OCR resolution, so no resize is needed,
+        # and rendering runs ahead in a background thread while the model is busy
+        pages = pdf_processor.prefetch_pages(
+            file_path,
+            max_dim=engine.MAX_IMAGE_DIM,
+            maxsize=PDF_BATCH_SIZE,  # The whole next batch is rendered while this one is OCR'd
+            executor=render_pool,
+            workers=render_workers
+        )
         
-        # Iterate over pages yielded by the helper
-        for page_num, page_image in pdf_processor.extract_pdf_pages(file_path):
-            
-            # Send PIL Image to OCR Engine
-            # Note: ocr_engine handles resizing and temp file saving internally
-            page_text = ocr_engine.transcribe_image(page_image, temp_dir)
-            
-            if page_text:
-                full_text.append(f"\n--- Page {page_num} ---\n")
-                full_text.append(page_text)
+        # Stream each page to disk as it arrives so memory stays flat on long PDFs
+        # and a crash still leaves the pages done so far (in a .partial file, so an
+        # interrupted run is not mistaken for an up-to-date output next time)
+        partial_path = output_path.with_name(output_path.name + ".partial")
+        with partial_path.open("w", encoding="utf-8") as out:
+            while batch := list(itertools.islice(pages, PDF_BATCH_SIZE)):
+                page_nums = [page_num for page_num, _ in batch]
+                page_images = [page_image for _, page_image in batch]
+                
+                # Send PIL Images to OCR Engine in one generate pass
+                # Note: the images are passed to MLX in memory; temp_dir is only a fallback
+                page_texts = engine.transcribe_images_batch(page_images, temp_dir, pre_sized=True)
+                
+                # Release page pixels now rather than when the next batch replaces them
+                for page_image in page_images:
+                    page_image.close()
+                del batch, page_images
+                
+                for page_num, page_text in zip(page_nums, page_texts):
+                    if page_text:
+                        out.write(f"\n--- Page {page_num} ---\n{page_text}\n")
+                        pages_written += 1
+                out.flush()
+                
+                # Collect whenever this batch crossed a multiple of GC_EVERY_N_PAGES
+                if page_nums[-1] // GC_EVERY_N_PAGES != (page_nums[0] - 1) // GC_EVERY_N_PAGES:
+                    gc.collect()
         
-        # Write results if we got any
-        if full_text:
-            final_text = "\n".join(full_text)
-            output_path.write_text(final_text, encoding="utf-8")
+        # Report results (drop the empty file if nothing was extracted)
+        if pages_written:
+            partial_path.replace(output_path)
             print(f"  ✅ PDF Saved to {output_path.name}\n")
         else:
+            partial_path.unlink(missing_ok=True)
             print(f"  ⚠️ No text extracted from PDF.\n")
 
     # --- Standard Image Processing ---
@@ -64,7 +128,7 @@ def process_file_item(file_path: Path, temp_dir: Path) -> None:
         print(f"🖼️ Processing Image: {file_path.name}...")
         
         # Send Path to OCR Engine
-        text = ocr_engine.transcribe_image(file_path, temp_dir)
+        text = engine.transcribe_image(file_path, temp_dir)
         
         if text:
             output_path.write_text(text, encoding="utf-8")
@@ -74,6 +138,13 @@ def process_file_item(file_path: Path, temp_dir: Path) -> None:
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="OCR images and PDFs in poc_images/ with Qwen3-VL.")
+    parser.add_argument('--force', action='store_true',
+                        help='Re-process files even if their .mlx.txt output is up to date.')
+    parser.add_argument('--render-workers', type=int, default=PDF_RENDER_WORKERS,
+                        help='Processes rasterizing PDF pages (helps for large or high-DPI pages; default: %(default)s).')
+    args = parser.parse_args()
+
     files = get_files_to_process(IMAGE_DIR)
     
     if not files:
@@ -82,13 +153,36 @@ def main() -> None:
 
     print(f"📋 Found {len(files)} files to process in {IMAGE_DIR}\n")
     
+    # Prefer a warm model in a running ocr_server; otherwise load it in-process
+    remote = ocr_server.connect()
+    if remote:
+        engine = remote
+    else:
+        import ocr_engine
+        engine = ocr_engine
+    
+    # One render pool for the whole run (started lazily by the executor on first PDF)
+    render_workers = max(1, args.render_workers)
+    render_pool = ProcessPoolExecutor(max_workers=render_workers) if render_workers > 1 else None
+    
     # Global temp context for the run
-    # (Passed down to engine for transient file creation)
+    # (Passed down to engine; only used if mlx_vlm cannot take in-memory images)
     with tempfile.TemporaryDirectory() as temp_dir_str:
         temp_dir = Path(temp_dir_str)
         
-        for file_path in files:
-            process_file_item(file_path, temp_dir)
+        try:
+            for file_path in files:
+                process_file_item(
+                    file_path, temp_dir, engine,
+                    force=args.force,
+                    render_pool=render_pool,
+                    render_workers=render_workers
+                )
+        finally:
+            if render_pool:
+                render_pool.shutdown(cancel_futures=True)
+            if remote:
+                remote.close()
 
     print(f"{ '='*40}")
     print(f"🎉 Complete.")
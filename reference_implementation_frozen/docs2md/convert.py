@@ -2,7 +2,7 @@
 """
 🚀 Super Document to Markdown Converter 🚀
 
-VERSION: 3.0.0
+VERSION: 3.11.33
 🤖 AI AGENTS: INCREMENT VERSION NUMBER WHEN MODIFYING THIS FILE!
    - Major changes (breaking): X.0.0
    - New features: X.Y.0  
@@ -12,30 +12,42 @@ VERSION: 3.0.0
 - By default, uses pypandoc for direct conversion.
 - Can optionally process documents through Google GenAI API.
 - Text files are copied as-is with .md extension.
-- Results cached based on SHA256 hash of content.
+- Results cached based on a BLAKE3 hash of content (SHA256 if blake3 is not installed).
 - Fancy colorful logging so you know WTF is happening.
 - v2.0.0: Enhanced error logging with full stack traces and worker thread context
 """
 
 import argparse
+import asyncio
 import concurrent.futures
+import functools
 import hashlib
 import json
 import logging
+import logging.handlers
+import mimetypes
+import mmap
+import multiprocessing
 import os
+import queue
 import random
+import re
+import shutil
 import signal
+import sqlite3
 import subprocess
 import sys
-import sys
 import tempfile
 import time
 import threading
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
-from dataclasses import dataclass, asdict, field
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from dataclasses import dataclass, field
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from stat import S_ISDIR
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 
 import colorlog
 import pypandoc
@@ -45,7 +57,7 @@ import pandas as pd
 from eml_to_threads import EmlToThreadsConverter
 
 # Script version - AI agents must increment when modifying!
-SCRIPT_VERSION = "3.5.0"
+SCRIPT_VERSION = "3.11.33"
 
 # Import the Google GenAI SDK
 try:
@@ -55,6 +67,30 @@ try:
 except ImportError:
     GOOGLE_GENAI_AVAILABLE = False
 
+# pyarrow renders Excel sheets with vectorized string kernels; tabulate (df.to_markdown) is the fallback
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# python-calamine (Rust) parses workbooks much faster than openpyxl; None means pandas' default engine
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = None
+
+# BLAKE3 (SIMD, multi-threaded) hashes cache keys several times faster than sha256; its keys carry a "b3-" prefix (filename-safe)
+try:
+    from blake3 import blake3
+    HASH_ALGORITHM = "blake3"
+    HASH_KEY_PREFIX = "b3-"
+except ImportError:
+    HASH_ALGORITHM = "sha256"
+    HASH_KEY_PREFIX = ""
+
 # Setup thread-safe logging
 def get_thread_id() -> str:
     """Get current thread ID for logging."""
@@ -87,7 +123,27 @@ def log_with_thread(level: str, message: str) -> None:
 MAX_FILE_SIZE_MB = 20
 MAX_PAGES_APPROX = 20
 THREADS_FOR_LOCAL_OPS = 4  # Number of threads for local file operations
+EML_PARSE_WORKERS = max(1, (os.cpu_count() or 1) // THREADS_FOR_LOCAL_OPS)  # Per EML directory: its share of the cores
 FILE_PROCESSING_TIMEOUT = 60  # Timeout in seconds for processing any single file
+FAILED_FILES_KEPT = 16  # Failed file names remembered per type for the summary (the count is always exact)
+API_CONCURRENCY = 16  # Max in-flight GenAI requests (LLM mode); also the number of file-prep threads
+PENDING_FILES_PER_WORKER = 4  # Files submitted ahead per pool worker; bounds outstanding futures
+HASH_CHUNK_SIZE = 1 << 20  # Read size for hashing when hashlib.file_digest is unavailable
+HASH_MMAP_MIN_SIZE = 64 * 1024  # Files in (min, max) bytes are hashed through mmap; others are read
+HASH_MMAP_MAX_SIZE = 2 * 1024 ** 3
+HASH_PARALLEL_MIN_SIZE = 8 << 20  # With blake3, files from this size are hashed multi-threaded
+UNCERTAINTY_MARKER_RE = re.compile(rb"\s*UNCERTAIN_CONVERSION\s*")  # LLM flag at the start of a response
+UNCERTAINTY_BANNER = "⚠️ **CONVERSION UNCERTAINTY WARNING** ⚠️\n\n---\n\n".encode('utf-8')
+HASH_META_FILENAME = "hash_meta.json"  # (size, mtime_ns) -> content hash sidecar in the cache dir
+CACHE_DB_FILENAME = "cache_index.db"  # SQLite (WAL) cache index
+CACHE_WRITE_BATCH = 64  # New cache entries are written to the index in transactions of this many
+LEGACY_CACHE_INDEX_FILENAME = "cache_index.json"  # Imported once into the SQLite index if present
+
+# Placeholder Markdown written for files that are not (or could not be) converted
+LLM_PREPARE_FAILED_TEMPLATE = "# Conversion Error\n\nFailed to prepare `{filename}` for LLM processing.\n"
+LLM_UNSUPPORTED_TEMPLATE = "# Unsupported File Type\n\n`{filename}` is not supported in LLM mode.\n"
+DIRECT_UNSUPPORTED_TEMPLATE = "# Unsupported File Type\n\n`{filename}` cannot be converted directly.\n"
+NOT_EXTRACTED_TEMPLATE = "# {kind} File\n\n`{filename}`\n\n**Note:** {kind} content is not extracted in direct conversion mode.\n"
 
 # WARNING: NEVER REINTRODUCE AN EMOJI DICTIONARY!
 # All emojis MUST be hard-coded inline to avoid abstraction hell.
@@ -112,17 +168,30 @@ def verify_timeout_reliability():
         logger.error(f"❌ Timeout mechanism failed: result={result}, elapsed={elapsed:.2f}s")
         return False
 
+# Shared by every thread-based timeout wait; never shut down (a timed-out task keeps its thread until it returns).
+# Sized for the LLM-mode file threads plus headroom for tasks that are still running after their timeout.
+_TIMEOUT_POOL = ThreadPoolExecutor(max_workers=API_CONCURRENCY * 2, thread_name_prefix="timeout")
+
 def process_file_with_timeout_test(func, timeout=FILE_PROCESSING_TIMEOUT):
     """Test version of timeout wrapper for verification."""
-    with ThreadPoolExecutor(max_workers=1) as executor:
-        future = executor.submit(func)
-        try:
-            result = future.result(timeout=timeout)
-            return result
-        except TimeoutError:
-            future.cancel()
-            executor.shutdown(wait=False)
-            return None
+    future = _TIMEOUT_POOL.submit(func)
+    try:
+        result = future.result(timeout=timeout)
+        return result
+    except TimeoutError:
+        future.cancel()
+        return None
+
+class FileProcessingTimeout(BaseException):
+    """
+    Raised by the SIGALRM handler when a file exceeds FILE_PROCESSING_TIMEOUT.
+    A BaseException so the converters' `except Exception` handlers don't swallow it.
+    """
+
+
+def _raise_file_timeout(signum, frame):
+    raise FileProcessingTimeout()
+
 
 def process_file_with_timeout(func, *args, **kwargs):
     """Execute file processing function with timeout and complete isolation."""
@@ -144,41 +213,140 @@ def process_file_with_timeout(func, *args, **kwargs):
                 logger.debug(f"⚠️ [{get_thread_id()}] Failed processing in {elapsed:.2f}s: {filename}")
             return result
         except Exception as e:
-            # THIS IS THE FIX: PRINT THE EXCEPTION DIRECTLY TO STDOUT
-            print(f"\n\n🔥🔥🔥 UNHANDLED EXCEPTION IN WORKER THREAD 🔥🔥🔥", file=sys.stdout)
-            print(f"--- Processing failed for file: {filename} ---", file=sys.stdout)
-            import traceback
-            traceback.print_exc(file=sys.stdout)
-            print(f"--- End of traceback for {filename} ---\n\n", file=sys.stdout)
+            # Never swallow a worker exception silently; the logger formats the traceback only if ERROR is enabled
+            logger.error(f"🔥 [{get_thread_id()}] UNHANDLED_WORKER_EXCEPTION: {filename} | Exception: {type(e).__name__} | Error: {e}", exc_info=True)
             return None
     
-    with ThreadPoolExecutor(max_workers=1) as executor:
-        future = executor.submit(run_with_timeout)
+    # In a pool worker's main thread an interval timer interrupts the work directly, no helper thread needed
+    if hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread():
+        previous_handler = signal.signal(signal.SIGALRM, _raise_file_timeout)
+        signal.setitimer(signal.ITIMER_REAL, FILE_PROCESSING_TIMEOUT)
         try:
             logger.debug(f"⏱️ Starting {FILE_PROCESSING_TIMEOUT}s timeout for: {filename}")
-            result = future.result(timeout=FILE_PROCESSING_TIMEOUT)
-            
-            # If result is None and we have error details, log them at the main thread level for visibility
-            if result is None and error_details['exception']:
-                logger.error(f"🚨 [{get_thread_id()}] FILE_PROCESSING_FAILED: {filename} | Exception: {error_details['exception']} | Error: {error_details['error_msg']}")
-            
-            return result
-        except TimeoutError:
+            return run_with_timeout()
+        except FileProcessingTimeout:
             logger.error(f"⌛ [{get_thread_id()}] TIMEOUT: {filename} | Timeout: {FILE_PROCESSING_TIMEOUT}s exceeded")
-            # Attempt to cancel the future 
-            cancelled = future.cancel()
-            if not cancelled:
-                logger.warning(f"⚠️ [{get_thread_id()}] Could not cancel timed-out task: {filename}")
-            # Force executor shutdown to prevent zombie threads
-            executor.shutdown(wait=False)
-            return None
-        except Exception as e:
-            exception_name = type(e).__name__
-            logger.error(f"💥 [{get_thread_id()}] TIMEOUT_WRAPPER_FAILURE: {filename} | Exception: {exception_name} | Error: {e}")
             return None
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+    
+    # Fallback (no SIGALRM on this platform, or called from a worker thread in LLM mode)
+    future = _TIMEOUT_POOL.submit(run_with_timeout)
+    try:
+        logger.debug(f"⏱️ Starting {FILE_PROCESSING_TIMEOUT}s timeout for: {filename}")
+        result = future.result(timeout=FILE_PROCESSING_TIMEOUT)
+        
+        # If result is None and we have error details, log them at the main thread level for visibility
+        if result is None and error_details['exception']:
+            logger.error(f"🚨 [{get_thread_id()}] FILE_PROCESSING_FAILED: {filename} | Exception: {error_details['exception']} | Error: {error_details['error_msg']}")
+        
+        return result
+    except TimeoutError:
+        logger.error(f"⌛ [{get_thread_id()}] TIMEOUT: {filename} | Timeout: {FILE_PROCESSING_TIMEOUT}s exceeded")
+        # Attempt to cancel the future 
+        cancelled = future.cancel()
+        if not cancelled:
+            logger.warning(f"⚠️ [{get_thread_id()}] Could not cancel timed-out task: {filename}")
+        return None
+    except Exception as e:
+        exception_name = type(e).__name__
+        logger.error(f"💥 [{get_thread_id()}] TIMEOUT_WRAPPER_FAILURE: {filename} | Exception: {exception_name} | Error: {e}")
+        return None
 
 
-@dataclass
+@functools.lru_cache(maxsize=4096)
+def file_type_for_suffix(ext: str) -> str:
+    """Map a lower-cased file extension to its file type (memoized; called several times per file)."""
+    if ext == '.eml':
+        return 'eml'
+    if ext in ['.txt', '.md', '.csv', '.json', '.xml', '.html', '.css', '.js', '.py', '.c', '.cpp', '.java', '.go', '.rb', '.sh']:
+        return 'text'
+    if ext == '.pdf':
+        return 'pdf'
+    if ext in ['.doc', '.docx', '.rtf', '.odt']:
+        return 'word'
+    if ext in ['.xls', '.xlsx', '.ods']:
+        return 'excel'
+    if ext in ['.ppt', '.pptx', '.odp']:
+        return 'powerpoint'
+    if ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.tif']:
+        return 'image'
+    return 'other'
+
+
+@functools.lru_cache(maxsize=8192)
+def large_file_check(file_path: str, mtime_ns: int, size: int) -> Tuple[bool, str]:
+    """Large-file verdict for a file; keyed on (path, mtime_ns, size) so a changed file is re-checked."""
+    file_size_mb = size / (1024 * 1024)
+    if file_size_mb > MAX_FILE_SIZE_MB:
+        return True, f"File size ({file_size_mb:.1f}MB) exceeds {MAX_FILE_SIZE_MB}MB limit"
+    if file_path.lower().endswith('.pdf'):
+        page_estimate = int(file_size_mb / 0.5)
+        if page_estimate > MAX_PAGES_APPROX:
+            return True, f"Estimated page count ({page_estimate}) exceeds {MAX_PAGES_APPROX} pages"
+    return False, ""
+
+
+# Characters that may not appear in a sheet-derived filename: anything but alphanumerics, ' ', '-' and '_'
+# (Unicode \w is exactly str.isalnum() plus '_', so non-ASCII letters are kept)
+_SHEET_NAME_CLEAN = re.compile(r"[^\w \-]")
+
+
+def dataframe_to_markdown(df: pd.DataFrame) -> str:
+    """
+    Render a DataFrame as a markdown pipe table.
+    Cells are formatted and joined with pyarrow compute kernels instead of per-cell Python (tabulate);
+    falls back to df.to_markdown when pyarrow is missing or a column cannot be cast to string.
+    """
+    if not PYARROW_AVAILABLE:
+        return df.to_markdown(index=False)
+    
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        cells = []
+        for column in table.columns:
+            if pa.types.is_timestamp(column.type):
+                # Whole seconds, like pandas' str(Timestamp) (Arrow's %S would add the fraction)
+                seconds = pc.cast(column, pa.timestamp("s", tz=column.type.tz), safe=False)
+                text = pc.strftime(seconds, format="%Y-%m-%d %H:%M:%S")
+            else:
+                text = pc.cast(column, pa.string())
+            text = pc.fill_null(text, "")
+            text = pc.replace_substring(text, "|", "\\|")
+            text = pc.replace_substring_regex(text, r"\r?\n", " ")
+            cells.append(text)
+        rows = pc.binary_join_element_wise(*cells, " | ")
+        rows = pc.binary_join_element_wise("| ", rows, " |", "")
+    except (pa.ArrowException, ValueError):
+        # e.g. object columns mixing numbers and text, or duplicate column names
+        return df.to_markdown(index=False)
+    
+    header = " | ".join(str(col).replace("|", "\\|") for col in df.columns)
+    separator = " | ".join("---" for _ in df.columns)
+    return "\n".join([f"| {header} |", f"| {separator} |", *rows.to_pylist()])
+
+
+def longest_backtick_run(file_path: Path) -> int:
+    """Length of the longest run of 3+ backticks in a file (0 if none), scanned as raw bytes through mmap."""
+    if file_path.stat().st_size == 0:
+        return 0  # Empty files cannot be mapped
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return max((m.end() - m.start() for m in re.finditer(rb"`{3,}", mm)), default=0)
+
+
+def link_or_copy(src: Path, dst: Path) -> None:
+    """Hardlink src to dst, replacing dst. Falls back to a copy across devices or where hardlinks are unsupported."""
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        pass  # Another worker linked the same content in the meantime
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+@dataclass(slots=True)
 class CacheEntry:
     """Data structure for cache entries."""
     original_filename: str
@@ -188,6 +356,18 @@ class CacheEntry:
     is_large: bool
     conversion_mode: str
     stats: Dict[str, Any] = field(default_factory=dict)
+    weak_key: bool = False  # Keyed on (path, size, mtime) instead of content; see DocumentConverter.get_weak_file_key
+
+    def hot(self) -> "HotCacheEntry":
+        """The part of this entry kept in memory for lookups."""
+        return HotCacheEntry(output_path=self.output_path, conversion_mode=self.conversion_mode)
+
+
+@dataclass(slots=True)
+class HotCacheEntry:
+    """In-memory view of a cache entry; the full CacheEntry (stats etc.) stays in the SQLite index."""
+    output_path: str
+    conversion_mode: str
 
 
 @dataclass
@@ -202,25 +382,17 @@ class CacheMetadata:
 class Cache:
     """Data structure for the entire cache."""
     metadata: CacheMetadata
-    files: Dict[str, CacheEntry]
+    files: Dict[str, HotCacheEntry]
 
 
 class DocumentConverter:
     """Main converter class with all functionality."""
     
-    def __init__(self, api_key: Optional[str], input_dir: Path, output_dir: Path, cache_dir: Path, use_llm: bool = False):
-        """Initialize the converter with paths and settings."""
-        self.api_key = api_key
-        self.input_dir = Path(input_dir)
-        self.output_dir = Path(output_dir)
-        self.cache_dir = Path(cache_dir)
-        self.use_llm = use_llm
-        self.client = None
-        
-        # Thread-safe mechanism for handling EML directories
-        self.processed_eml_dirs = set()
-        self.eml_dir_lock = threading.Lock()
-        self.eml_processing_results = {}  # Store EML processing results for accurate reporting
+    def __init__(self, api_key: Optional[str], input_dir: Path, output_dir: Path, cache_dir: Path, use_llm: bool = False,
+                 workers: str = "processes"):
+        """Initialize the converter with paths and settings. workers ('processes' or 'threads') picks the direct-mode pool."""
+        self._init_state(api_key, input_dir, output_dir, cache_dir, use_llm)
+        self.workers = workers
         
         if self.use_llm:
             if not GOOGLE_GENAI_AVAILABLE:
@@ -230,14 +402,17 @@ class DocumentConverter:
                 logger.critical(f"❌ GEMINI_API_KEY must be set to use LLM mode.")
                 sys.exit(1)
             self.client = self._setup_client()
-        
-        self.cache = self._init_cache()
-        self.temp_dir = Path(tempfile.mkdtemp())
+            self._start_api_loop()
         
         # Create required directories
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
+        self.hash_meta = self._load_hash_meta()
+        self._cache_db = self._open_cache_db()
+        self.cache = self._init_cache()
+        self.temp_dir = Path(tempfile.mkdtemp())
+        
         logger.info(f"🚀 Initialized converter v{SCRIPT_VERSION}")
         logger.info(f"ℹ️ Input directory: {self.input_dir}")
         logger.info(f"ℹ️ Output directory: {self.output_dir}")
@@ -252,6 +427,50 @@ class DocumentConverter:
         else:
             logger.info(f"ℹ️ Timeout verification inconclusive. This is common in some containerized environments. Proceeding, but individual file hangs may not be preventable.")
 
+    def _init_state(self, api_key: Optional[str], input_dir: Path, output_dir: Path, cache_dir: Path, use_llm: bool) -> None:
+        """Set the plain attributes shared by the main converter and pool workers."""
+        self.api_key = api_key
+        self.input_dir = Path(input_dir)
+        self._input_prefix = os.path.join(self.input_dir, '')  # "input_dir/" for cheap relative paths
+        self.output_dir = Path(output_dir)
+        self.cache_dir = Path(cache_dir)
+        # String forms for per-file paths: Path(str, str) skips re-parsing the directory Path every time
+        self._output_dir_str = os.fspath(self.output_dir)
+        self._cache_dir_str = os.fspath(self.cache_dir)
+        self.use_llm = use_llm
+        self.client = None
+        self._pool = None
+        self._api_loop = None
+        
+        # Thread-safe mechanism for handling EML directories
+        self.processed_eml_dirs: Dict[str, object] = {}  # Claimed lock-free via setdefault
+        self.eml_processing_results = {}  # EML results per directory; single-key assignments are atomic, no lock needed
+        self._file_type_cache: Dict[Path, str] = {}  # Filled by run()'s input walk, extended lazily by get_file_type
+        self._made_dirs = {self.output_dir}  # Output directories already created; set.add is atomic, no lock needed
+        
+        # Only the main process writes the cache index; workers queue their entries here
+        self.owns_cache_index = True
+        self.unsaved_cache_entries: Dict[str, CacheEntry] = {}
+        self._cache_db = None
+        self._cache_db_lock = threading.Lock()
+        self._pending_cache_entries: Dict[str, CacheEntry] = {}  # Not yet written to the index
+        self._pending_cache_lock = threading.Lock()
+
+    @classmethod
+    def for_pool_worker(cls, input_dir: Path, output_dir: Path, cache_dir: Path,
+                        cache: Cache, hash_meta: Dict[str, Dict[str, Any]]) -> "DocumentConverter":
+        """
+        Build a converter inside a ProcessPoolExecutor worker (direct mode only).
+        Skips client setup and timeout verification, and leaves cache index writes to the parent.
+        """
+        converter = cls.__new__(cls)
+        converter._init_state(None, input_dir, output_dir, cache_dir, use_llm=False)
+        converter.owns_cache_index = False
+        converter.hash_meta = hash_meta
+        converter.cache = cache
+        converter.temp_dir = None  # Only used by LLM mode
+        return converter
+
     def _setup_client(self) -> Any:
         """Initialize the GenAI client with the provided API key."""
         try:
@@ -262,89 +481,196 @@ class DocumentConverter:
             logger.critical(f"❌ Failed to initialize Google GenAI client: {e}")
             sys.exit(1)
     
+    def _open_cache_db(self) -> sqlite3.Connection:
+        """Open (creating if needed) the SQLite cache index in WAL mode."""
+        con = sqlite3.connect(self.cache_dir / CACHE_DB_FILENAME, check_same_thread=False)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS files(hash TEXT PRIMARY KEY, original TEXT, output TEXT, type TEXT, "
+            "is_large INT, mode TEXT, stats TEXT, cached_on TEXT, weak_key INT DEFAULT 0)"
+        )
+        con.execute("CREATE TABLE IF NOT EXISTS metadata(key TEXT PRIMARY KEY, value TEXT)")
+        con.commit()
+        return con
+    
     def _init_cache(self) -> Cache:
-        """Initialize and return cache data structure."""
-        cache_file = self.cache_dir / "cache_index.json"
-        
-        if cache_file.exists():
-            try:
-                with open(cache_file, 'r') as f:
-                    cache_data = json.load(f)
-                    metadata = CacheMetadata(**cache_data.get('metadata', {}))
-                    files = {k: CacheEntry(**v) for k, v in cache_data.get('files', {}).items()}
-                    cache = Cache(metadata=metadata, files=files)
-                    logger.info(f"✅ Loaded cache with {len(files)} entries")
-                    return cache
-            except Exception as e:
-                logger.warning(f"⚠️ Cache file exists but could not be read: {e}")
+        """Initialize and return cache data structure, loaded from the SQLite index."""
+        metadata_rows = dict(self._cache_db.execute("SELECT key, value FROM metadata"))
+        if 'created' not in metadata_rows:
+            now = datetime.now().isoformat()
+            cache = Cache(metadata=CacheMetadata(created=now, last_updated=now, file_count=0), files={})
+            self._import_legacy_cache_index(cache)
+            self._save_cache(cache)
+            logger.info(f"ℹ️ Created new cache")
+            return cache
         
-        metadata = CacheMetadata(created=datetime.now().isoformat(), last_updated=datetime.now().isoformat(), file_count=0)
-        cache = Cache(metadata=metadata, files={})
-        self._save_cache(cache)
-        logger.info(f"ℹ️ Created new cache")
-        return cache
+        # Only the hot columns are loaded; stats and the rest are read from the index on demand
+        files = {
+            file_hash: HotCacheEntry(output_path=output, conversion_mode=mode)
+            for file_hash, output, mode in self._cache_db.execute("SELECT hash, output, mode FROM files")
+        }
+        metadata = CacheMetadata(
+            created=metadata_rows['created'],
+            last_updated=metadata_rows.get('last_updated', metadata_rows['created']),
+            file_count=len(files)
+        )
+        logger.info(f"✅ Loaded cache with {len(files)} entries")
+        return Cache(metadata=metadata, files=files)
+    
+    def _import_legacy_cache_index(self, cache: Cache) -> None:
+        """Carry entries over from a cache_index.json written by an older version."""
+        legacy_file = self.cache_dir / LEGACY_CACHE_INDEX_FILENAME
+        if not legacy_file.exists():
+            return
+        try:
+            with open(legacy_file, 'r') as f:
+                cache_data = json.load(f)
+            cache.metadata = CacheMetadata(**cache_data.get('metadata', {}))
+            entries = {k: CacheEntry(**v) for k, v in cache_data.get('files', {}).items()}
+            self._write_cache_entries(entries)
+            cache.files.update({k: entry.hot() for k, entry in entries.items()})
+            logger.info(f"✅ Imported {len(entries)} entries from {LEGACY_CACHE_INDEX_FILENAME}")
+        except Exception as e:
+            logger.warning(f"⚠️ Legacy cache file exists but could not be imported: {e}")
+    
+    def _write_cache_entries(self, entries: Dict[str, CacheEntry]) -> None:
+        """Insert or replace cache entries in the SQLite index (one small transaction)."""
+        rows = [
+            (file_hash, entry.original_filename, entry.output_path, entry.file_type, int(entry.is_large),
+             entry.conversion_mode, json.dumps(entry.stats), entry.cached_on, int(entry.weak_key))
+            for file_hash, entry in entries.items()
+        ]
+        with self._cache_db_lock:
+            self._cache_db.executemany(
+                "INSERT OR REPLACE INTO files(hash, original, output, type, is_large, mode, stats, cached_on, weak_key) "
+                "VALUES (?,?,?,?,?,?,?,?,?)",
+                rows
+            )
+            self._cache_db.commit()
+    
+    def _queue_cache_entries(self, entries: Dict[str, CacheEntry]) -> None:
+        """Buffer entries for the SQLite index and write them once CACHE_WRITE_BATCH have accumulated."""
+        with self._pending_cache_lock:
+            self._pending_cache_entries.update(entries)
+            if len(self._pending_cache_entries) < CACHE_WRITE_BATCH:
+                return
+            entries, self._pending_cache_entries = self._pending_cache_entries, {}
+        self._write_cache_entries(entries)
+    
+    def _flush_cache_entries(self) -> None:
+        """Write any buffered cache entries to the SQLite index."""
+        with self._pending_cache_lock:
+            entries, self._pending_cache_entries = self._pending_cache_entries, {}
+        if entries:
+            self._write_cache_entries(entries)
     
     def _save_cache(self, cache: Cache) -> None:
-        """Save cache data structure to disk."""
-        cache_file = self.cache_dir / "cache_index.json"
+        """Save cache metadata (and the hash metadata sidecar) to disk, writing any buffered entries first."""
+        self._flush_cache_entries()
         cache.metadata.last_updated = datetime.now().isoformat()
         cache.metadata.file_count = len(cache.files)
-        cache_dict = {"metadata": asdict(cache.metadata), "files": {k: asdict(v) for k, v in cache.files.items()}}
+        with self._cache_db_lock:
+            self._cache_db.executemany(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?)",
+                [('created', cache.metadata.created), ('last_updated', cache.metadata.last_updated)]
+            )
+            self._cache_db.commit()
+        
+        self._save_hash_meta()
+        logger.debug(f"💾 Cache saved with {cache.metadata.file_count} entries")
+    
+    def _load_hash_meta(self) -> Dict[str, Dict[str, Any]]:
+        """Load the {path: {size, mtime_ns, algo, digest}} sidecar used to skip re-hashing unchanged files."""
+        hash_meta_file = self.cache_dir / HASH_META_FILENAME
+        if hash_meta_file.exists():
+            try:
+                with open(hash_meta_file, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"⚠️ Hash metadata file exists but could not be read: {e}")
+        return {}
+    
+    def _save_hash_meta(self) -> None:
+        """Save the hash metadata sidecar to disk."""
+        hash_meta_file = self.cache_dir / HASH_META_FILENAME
+        hash_meta = dict(self.hash_meta)  # Snapshot, worker threads may add entries meanwhile
         
         with tempfile.NamedTemporaryFile(mode='w', dir=self.cache_dir, delete=False) as tmp:
-            json.dump(cache_dict, tmp, indent=2)
+            json.dump(hash_meta, tmp)
             tmp_path = tmp.name
         
-        Path(tmp_path).rename(cache_file)
-        logger.debug(f"💾 Cache saved with {cache.metadata.file_count} entries")
+        Path(tmp_path).rename(hash_meta_file)
     
-    def get_file_hash(self, file_path: Path) -> str:
-        """Calculate SHA256 hash of file content for caching."""
-        sha256_hash = hashlib.sha256()
+    def get_file_hash(self, file_path: Path, st: Optional[os.stat_result] = None) -> str:
+        """
+        Calculate the content hash (BLAKE3, or SHA256 if blake3 is not installed) of a file for caching.
+        If the file's size and mtime match the hash metadata sidecar, the stored
+        digest is returned without reading the file. Pass st to reuse a stat the caller already made.
+        """
+        new_hasher = blake3 if HASH_ALGORITHM == "blake3" else hashlib.sha256
         try:
-            with open(file_path, "rb") as f:
-                for byte_block in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(byte_block)
-            return sha256_hash.hexdigest()
+            st = st or file_path.stat()
+            meta_key = str(file_path)
+            meta = self.hash_meta.get(meta_key)
+            if (meta and meta['size'] == st.st_size and meta['mtime_ns'] == st.st_mtime_ns
+                    and meta.get('algo') == HASH_ALGORITHM):
+                return meta['digest']
+            
+            if HASH_ALGORITHM == "blake3" and st.st_size >= HASH_PARALLEL_MIN_SIZE:
+                # blake3 maps the file itself and hashes it on all cores without holding the GIL; no size cap
+                file_hash = blake3(max_threads=blake3.AUTO)
+                file_hash.update_mmap(file_path)
+            else:
+                file_hash = new_hasher()
+                with open(file_path, "rb", buffering=0) as f:
+                    if HASH_MMAP_MIN_SIZE < st.st_size < HASH_MMAP_MAX_SIZE:
+                        # Hash the mapped pages directly, no copy into a user-space buffer
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                            if hasattr(mm, "madvise"):
+                                mm.madvise(mmap.MADV_SEQUENTIAL)
+                            file_hash.update(mm)
+                    elif hasattr(hashlib, "file_digest"):  # Python 3.11+
+                        file_hash = hashlib.file_digest(f, new_hasher)
+                    else:
+                        buf = bytearray(HASH_CHUNK_SIZE)
+                        mv = memoryview(buf)
+                        while n := f.readinto(buf):
+                            file_hash.update(mv[:n])
+            digest = HASH_KEY_PREFIX + file_hash.hexdigest()
+            self.hash_meta[meta_key] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                                        'algo': HASH_ALGORITHM, 'digest': digest}
+            return digest
         except Exception as e:
             exception_name = type(e).__name__
             logger.error(f"💥 [{get_thread_id()}] FILE_HASH_FAILED: {file_path.name} | Exception: {exception_name} | Error: {e}")
             return f"ERROR_HASH_{datetime.now().isoformat()}"
     
+    def get_weak_file_key(self, file_path: Path, st: Optional[os.stat_result] = None) -> str:
+        """Cache key from (relative path, size, mtime_ns) for large files; O(1) instead of hashing the content."""
+        st = st or file_path.stat()
+        try:
+            rel = file_path.relative_to(self.input_dir)
+        except ValueError:
+            rel = file_path
+        return hashlib.sha256(f"{rel}|{st.st_size}|{st.st_mtime_ns}".encode()).hexdigest()
+    
     def get_file_type(self, file_path: Path) -> str:
-        """Determine file type based on extension."""
-        ext = file_path.suffix.lower()
-        if ext == '.eml':
-            return 'eml'
-        if ext in ['.txt', '.md', '.csv', '.json', '.xml', '.html', '.css', '.js', '.py', '.c', '.cpp', '.java', '.go', '.rb', '.sh']:
-            return 'text'
-        if ext == '.pdf':
-            return 'pdf'
-        if ext in ['.doc', '.docx', '.rtf', '.odt']:
-            return 'word'
-        if ext in ['.xls', '.xlsx', '.ods']:
-            return 'excel'
-        if ext in ['.ppt', '.pptx', '.odp']:
-            return 'powerpoint'
-        if ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.tif']:
-            return 'image'
-        return 'other'
+        """Determine file type based on extension, memoized per path."""
+        file_type = self._file_type_cache.get(file_path)
+        if file_type is None:
+            file_type = self._file_type_cache[file_path] = file_type_for_suffix(file_path.suffix.lower())
+        return file_type
     
-    def is_large_file(self, file_path: Path) -> Tuple[bool, str]:
+    def is_large_file(self, file_path: Path, st: Optional[os.stat_result] = None) -> Tuple[bool, str]:
         """Check if file is large."""
         try:
-            file_size_mb = file_path.stat().st_size / (1024 * 1024)
-            if file_size_mb > MAX_FILE_SIZE_MB:
-                return True, f"File size ({file_size_mb:.1f}MB) exceeds {MAX_FILE_SIZE_MB}MB limit"
-            if file_path.suffix.lower() == '.pdf':
-                page_estimate = int(file_size_mb / 0.5)
-                if page_estimate > MAX_PAGES_APPROX:
-                    return True, f"Estimated page count ({page_estimate}) exceeds {MAX_PAGES_APPROX} pages"
+            st = st or file_path.stat()
+            return large_file_check(str(file_path), st.st_mtime_ns, st.st_size)
         except Exception as e:
             exception_name = type(e).__name__
             logger.warning(f"⚠️ [{get_thread_id()}] FILE_SIZE_CHECK_FAILED: {file_path.name} | Exception: {exception_name} | Error: {e}")
             return False, ""
-        return False, ""
 
     def direct_convert_to_md(self, input_file: Path, output_path: Path) -> bool:
         """Convert file to Markdown using Pandoc."""
@@ -410,13 +736,15 @@ class DocumentConverter:
     def process_text_file(self, file_path: Path, output_path: Path) -> bool:
         """Process a text file by copying content with minimal formatting."""
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                content = f.read()
+            # Fence must be longer than any backtick run in the content, or the code block ends early
+            fence = "`" * max(3, longest_backtick_run(file_path) + 1)
             
-            markdown = f"# {file_path.name}\n\n```\n{content}\n```\n"
-            
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(markdown)
+            # Stream the content through in chunks rather than building the whole document in memory
+            with open(file_path, 'r', encoding='utf-8', errors='replace') as src, \
+                 open(output_path, 'w', encoding='utf-8') as dst:
+                dst.write(f"# {file_path.name}\n\n{fence}\n")
+                shutil.copyfileobj(src, dst, HASH_CHUNK_SIZE)
+                dst.write(f"\n{fence}\n")
             
             logger.info(f"✅ Processed text file: {file_path.name}")
             return True
@@ -435,23 +763,27 @@ class DocumentConverter:
         
         try:
             # Read all sheets from Excel file
-            excel_file = pd.ExcelFile(file_path)
+            try:
+                excel_file = pd.ExcelFile(file_path, engine=EXCEL_ENGINE)
+            except ValueError:
+                # pandas < 2.2 doesn't know the calamine engine
+                excel_file = pd.ExcelFile(file_path)
             sheet_names = excel_file.sheet_names
             
             logger.info(f"ℹ️ Found {len(sheet_names)} sheets in {file_path.name}: {sheet_names}")
             
-            for sheet_name in sheet_names:
+            for sheet_index, sheet_name in enumerate(sheet_names, start=1):
                 # Create output filename: original_filename_sheetname.md
-                clean_sheet_name = "".join(c for c in sheet_name if c.isalnum() or c in (' ', '-', '_')).strip()
+                clean_sheet_name = _SHEET_NAME_CLEAN.sub("", sheet_name).strip()
                 if not clean_sheet_name:
-                    clean_sheet_name = f"Sheet{sheet_names.index(sheet_name) + 1}"
+                    clean_sheet_name = f"Sheet{sheet_index}"
                 
                 output_filename = f"{filename_base}_{clean_sheet_name}.md"
                 output_path = target_dir / output_filename
                 
                 try:
-                    # Read the specific sheet
-                    df = pd.read_excel(file_path, sheet_name=sheet_name)
+                    # Read the specific sheet from the already-open workbook
+                    df = excel_file.parse(sheet_name)
                     
                     # Convert DataFrame to markdown
                     markdown_content = f"# {file_path.name} - {sheet_name}\n\n"
@@ -460,7 +792,7 @@ class DocumentConverter:
                         markdown_content += "*This sheet is empty.*\n"
                     else:
                         # Convert DataFrame to markdown table
-                        markdown_table = df.to_markdown(index=False)
+                        markdown_table = dataframe_to_markdown(df)
                         markdown_content += f"{markdown_table}\n"
                         
                         # Add some stats
@@ -495,42 +827,58 @@ class DocumentConverter:
                 f.write(f"# Error Processing Excel File\n\n**File:** `{file_path.name}`\n\n**Error:**\n```\n{e}\n```\n")
             return [error_output]
     
+    def _start_api_loop(self) -> None:
+        """Start the event loop that runs all GenAI requests (LLM mode) in a background thread."""
+        self._api_loop = asyncio.new_event_loop()
+        self._api_semaphore = asyncio.Semaphore(API_CONCURRENCY)
+        threading.Thread(target=self._api_loop.run_forever, name="genai-api", daemon=True).start()
+    
     def process_with_api(self, file_path: Path, output_path: Path) -> Tuple[bool, Dict[str, Any]]:
-        """Process a file using the Google GenAI API with retry logic."""
+        """Process a file using the Google GenAI API; the request runs on the shared API event loop."""
+        return asyncio.run_coroutine_threadsafe(self._process_with_api_async(file_path, output_path), self._api_loop).result()
+    
+    async def _process_with_api_async(self, file_path: Path, output_path: Path) -> Tuple[bool, Dict[str, Any]]:
+        """Process a file using the async Google GenAI client with retry logic, at most API_CONCURRENCY at a time."""
         stats = {"start_time": datetime.now().isoformat(), "file_size_mb": file_path.stat().st_size / (1024 * 1024), "uncertainty_detected": False, "retries": 0}
         max_retries = 5
         base_delay = 2
+        uploaded_file = None  # Uploaded once; retries only repeat the generate call
+        mime_type = mimetypes.guess_type(file_path.name)[0]
 
         for attempt in range(max_retries):
             try:
                 logger.info(f"🤖 Sending {file_path.name} to Google GenAI API (Attempt {attempt + 1})")
                 
-                start_time = time.time()
-                uploaded_file = self.client.files.upload(file=str(file_path))
-                stats["upload_time"] = time.time() - start_time
-                
-                contents = [types.Content(role="user", parts=[
-                    types.Part.from_uri(file_uri=uploaded_file.uri, mime_type=uploaded_file.mime_type),
-                    types.Part.from_text(text="Convert this document to a markdown document. If you're uncertain about any content, include 'UNCERTAIN_CONVERSION' at the beginning of your response.")
-                ])]
-                
-                model = "models/gemini-1.5-pro-latest"
-                config = types.GenerateContentConfig(temperature=1, top_p=0.95, top_k=64, max_output_tokens=8192, response_mime_type="text/plain")
-                
-                api_start_time = time.time()
-                response = self.client.models.generate_content(model=model, contents=contents, config=config)
-                stats["api_time"] = time.time() - api_start_time
+                async with self._api_semaphore:
+                    if uploaded_file is None:
+                        # The SDK streams this with the resumable upload protocol, in chunks
+                        start_time = time.time()
+                        upload_config = {"mime_type": mime_type} if mime_type else None
+                        uploaded_file = await self.client.aio.files.upload(file=str(file_path), config=upload_config)
+                        stats["upload_time"] = time.time() - start_time
+                    
+                    contents = [types.Content(role="user", parts=[
+                        types.Part.from_uri(file_uri=uploaded_file.uri, mime_type=uploaded_file.mime_type),
+                        types.Part.from_text(text="Convert this document to a markdown document. If you're uncertain about any content, include 'UNCERTAIN_CONVERSION' at the beginning of your response.")
+                    ])]
+                    
+                    model = "models/gemini-1.5-pro-latest"
+                    config = types.GenerateContentConfig(temperature=1, top_p=0.95, top_k=64, max_output_tokens=8192, response_mime_type="text/plain")
+                    
+                    api_start_time = time.time()
+                    response = await self.client.aio.models.generate_content(model=model, contents=contents, config=config)
+                    stats["api_time"] = time.time() - api_start_time
                 
                 if hasattr(response, 'text'):
-                    markdown_text = response.text
-                    if markdown_text.strip().startswith("UNCERTAIN_CONVERSION"):
-                        stats["uncertainty_detected"] = True
-                        markdown_text = markdown_text.replace("UNCERTAIN_CONVERSION", "", 1).strip()
-                        logger.warning(f"⚠️ Uncertainty detected in conversion of {file_path.name}")
-                        markdown_text = "⚠️ **CONVERSION UNCERTAINTY WARNING** ⚠️\n\n---\n\n" + markdown_text
-                    
-                    with open(output_path, 'w', encoding='utf-8') as f:
-                        f.write(markdown_text)
+                    # Encode once and write a view past the marker, instead of strip/replace/concat copies
+                    raw = response.text.encode('utf-8')
+                    marker = UNCERTAINTY_MARKER_RE.match(raw)
+                    with open(output_path, 'wb') as f:
+                        if marker:
+                            stats["uncertainty_detected"] = True
+                            logger.warning(f"⚠️ Uncertainty detected in conversion of {file_path.name}")
+                            f.write(UNCERTAINTY_BANNER)
+                        f.write(memoryview(raw)[marker.end() if marker else 0:])
                     
                     stats["end_time"] = datetime.now().isoformat()
                     logger.info(f"✅ Successfully converted {file_path.name} via API")
@@ -543,7 +891,7 @@ class DocumentConverter:
                 if "RESOURCE_EXHAUSTED" in error_msg and attempt < max_retries - 1:
                     delay = (base_delay ** attempt) + random.uniform(0, 1)
                     logger.warning(f"⚠️ Rate limit hit for {file_path.name}. Retrying in {delay:.2f}s...")
-                    time.sleep(delay)
+                    await asyncio.sleep(delay)
                     stats["retries"] = attempt + 1
                     continue
                 else:
@@ -557,7 +905,7 @@ class DocumentConverter:
         return False, stats
     
     def store_in_cache(self, file_hash: str, original_path: Path, output_path: Path, 
-                     file_type: str, is_large: bool, stats: Dict[str, Any]) -> None:
+                     file_type: str, is_large: bool, stats: Dict[str, Any], weak_key: bool = False) -> None:
         """Store processed file result in cache."""
         cache_entry = CacheEntry(
             original_filename=original_path.name,
@@ -566,20 +914,21 @@ class DocumentConverter:
             file_type=file_type,
             is_large=is_large,
             conversion_mode='llm' if self.use_llm else 'direct',
-            stats=stats
+            stats=stats,
+            weak_key=weak_key
         )
-        self.cache.files[file_hash] = cache_entry
-        cache_content_path = self.cache_dir / f"{file_hash}.md"
+        self.cache.files[file_hash] = cache_entry.hot()
+        cache_content_path = Path(self._cache_dir_str, file_hash + ".md")
         try:
-            with open(output_path, 'r', encoding='utf-8') as src_file:
-                content = src_file.read()
-            with open(cache_content_path, 'w', encoding='utf-8') as dst_file:
-                dst_file.write(content)
+            link_or_copy(output_path, cache_content_path)
             logger.debug(f"💾 Saved content to cache: {file_hash}.md")
         except Exception as e:
             exception_name = type(e).__name__
             logger.warning(f"⚠️ [{get_thread_id()}] CACHE_SAVE_FAILED | Exception: {exception_name} | Error: {e}")
-        self._save_cache(self.cache)
+        if self.owns_cache_index:
+            self._queue_cache_entries({file_hash: cache_entry})
+        else:
+            self.unsaved_cache_entries[file_hash] = cache_entry
     
     def get_from_cache(self, file_hash: str, output_path: Path) -> bool:
         """Retrieve cached result if available, checking conversion mode."""
@@ -592,16 +941,23 @@ class DocumentConverter:
             logger.info(f"🔍 Cache entry found, but for different mode ('{entry.conversion_mode}'). Re-processing in '{current_mode}' mode.")
             return False
 
-        cache_content_path = self.cache_dir / f"{file_hash}.md"
-        if not cache_content_path.exists():
+        cache_content_path = Path(self._cache_dir_str, file_hash + ".md")
+        try:
+            cache_st = cache_content_path.stat()
+        except FileNotFoundError:
             logger.warning(f"⚠️ Cache entry exists but content file missing: {file_hash}")
             return False
         
         try:
-            with open(cache_content_path, 'r', encoding='utf-8') as src_file:
-                content = src_file.read()
-            with open(output_path, 'w', encoding='utf-8') as dst_file:
-                dst_file.write(content)
+            # Unchanged input on a re-run: the output is still hardlinked to the cached content, nothing to do
+            try:
+                out_st = output_path.stat()
+                if out_st.st_ino == cache_st.st_ino and out_st.st_dev == cache_st.st_dev:
+                    logger.info(f"🎯 Using cached version for {output_path.name} ({current_mode} mode, already in place)")
+                    return True
+            except FileNotFoundError:
+                pass
+            link_or_copy(cache_content_path, output_path)
             logger.info(f"🎯 Using cached version for {output_path.name} ({current_mode} mode)")
             return True
         except Exception as e:
@@ -617,14 +973,12 @@ class DocumentConverter:
             if file_type == 'eml':
                 return self._process_eml_file_isolated(file_path)
             else:
-                return self._process_regular_file_isolated(file_path)
+                return self._process_regular_file_isolated(file_path, file_type)
                 
         except Exception as e:
             exception_name = type(e).__name__
-            import traceback
-            tb = traceback.format_exc()
             logger.error(f"💥 [{get_thread_id()}] COMPLETE_FAILURE: {file_path.name} | Exception: {exception_name} | Error: {e}")
-            logger.error(f"💥 [{get_thread_id()}] COMPLETE_FAILURE_TRACEBACK for {file_path.name}:\n{tb}")
+            logger.error(f"💥 [{get_thread_id()}] COMPLETE_FAILURE_TRACEBACK for {file_path.name}:", exc_info=True)
             
             # IMMEDIATE WORKER CONTEXT: Log this failure so main thread knows what happened
             logger.error(f"🎯 [{get_thread_id()}] WORKER_THREAD_FAILURE_SUMMARY: File '{file_path.name}' completely failed in worker thread - main thread will show 'Worker returned None'")
@@ -634,25 +988,24 @@ class DocumentConverter:
         """Process .eml file with complete isolation - failures won't affect other files."""
         try:
             eml_dir = file_path.parent
-            with self.eml_dir_lock:
-                if eml_dir in self.processed_eml_dirs:
-                    # This directory has already been processed by another thread
-                    # Return a success indicator since EML processing was successful
-                    return Path("_eml_already_processed_successfully")
-                # Mark this directory as processed
-                self.processed_eml_dirs.add(eml_dir)
+            # Claim the directory: setdefault is a single atomic dict operation (str keys hash and
+            # compare in C), so only the first thread gets its own token back
+            claim = object()
+            if self.processed_eml_dirs.setdefault(str(eml_dir), claim) is not claim:
+                # This directory has already been processed by another thread
+                # Return a success indicator since EML processing was successful
+                return Path("_eml_already_processed_successfully")
             
             logger.info(f"📧 Processing .eml files in directory: {eml_dir.relative_to(self.input_dir)}")
             
             try:
                 relative_dir = eml_dir.relative_to(self.input_dir)
                 output_eml_dir = self.output_dir / relative_dir
-                converter = EmlToThreadsConverter(eml_dir, output_eml_dir)
+                converter = EmlToThreadsConverter(eml_dir, output_eml_dir, parse_workers=EML_PARSE_WORKERS)
                 result = converter.convert()
                 
                 # Store EML processing results for accurate reporting
-                with self.eml_dir_lock:
-                    self.eml_processing_results[eml_dir] = result
+                self.eml_processing_results[eml_dir] = result
                 
                 # Enhanced EML conversion results logging with stack traces
                 if result['failed_files'] > 0:
@@ -680,15 +1033,9 @@ class DocumentConverter:
                 # We return a dummy path to indicate success for the progress bar
                 return Path(output_eml_dir) / "_eml_conversion_success"
             except Exception as e:
-                import traceback
-                import sys
-                print(f"--- START OF DETAILED TRACEBACK FOR {eml_dir.name} ---")
-                traceback.print_exc(file=sys.stdout)
-                print(f"--- END OF DETAILED TRACEBACK FOR {eml_dir.name} ---")
                 exception_name = type(e).__name__
-                tb = traceback.format_exc()
                 logger.error(f"💥 [{get_thread_id()}] EML_PROCESSING_FAILED: {eml_dir.name} | Exception: {exception_name} | Error: {e}")
-                logger.error(f"💥 [{get_thread_id()}] EML_PROCESSING_TRACEBACK for {eml_dir.name}:\n{tb}")
+                logger.error(f"💥 [{get_thread_id()}] EML_PROCESSING_TRACEBACK for {eml_dir.name}:", exc_info=True)
                 
                 # IMMEDIATE WORKER CONTEXT: Log this failure so it shows up in stdout before main thread sees None
                 logger.error(f"🎯 [{get_thread_id()}] WORKER_THREAD_FAILURE_SUMMARY: EML directory '{eml_dir.name}' processing completely failed - main thread will show 'Worker returned None' for this")
@@ -698,45 +1045,48 @@ class DocumentConverter:
                 
         except Exception as e:
             exception_name = type(e).__name__
-            import traceback
-            tb = traceback.format_exc()
             logger.error(f"💥 [{get_thread_id()}] EML_ISOLATION_FAILURE: {file_path.name} | Exception: {exception_name} | Error: {e}")
-            logger.error(f"💥 [{get_thread_id()}] EML_ISOLATION_TRACEBACK for {file_path.name}:\n{tb}")
+            logger.error(f"💥 [{get_thread_id()}] EML_ISOLATION_TRACEBACK for {file_path.name}:", exc_info=True)
             
             # IMMEDIATE WORKER CONTEXT: Log this isolation failure
             logger.error(f"🎯 [{get_thread_id()}] WORKER_THREAD_FAILURE_SUMMARY: EML file '{file_path.name}' failed during isolation - main thread will show 'Worker returned None'")
             return None
     
-    def _process_regular_file_isolated(self, file_path: Path) -> Optional[Path]:
-        """Process regular (non-.eml) file with complete isolation."""
+    def _process_regular_file_isolated(self, file_path: Path, file_type: str) -> Optional[Path]:
+        """Process regular (non-.eml) file with complete isolation. file_type is the classification process_file already made."""
         try:
-            file_type = self.get_file_type(file_path)
             filename = file_path.name
             
-            try:
-                relative_path = file_path.relative_to(self.input_dir)
-                output_path = self.output_dir / f"{relative_path}.md"
-                output_path.parent.mkdir(parents=True, exist_ok=True)
-            except ValueError:
-                output_path = self.output_dir / f"{filename}.md"
+            # Relative path by string prefix; relative_to splits and compares every path part
+            file_str = os.fspath(file_path)
+            if file_str.startswith(self._input_prefix):
+                output_path = Path(self._output_dir_str, file_str[len(self._input_prefix):] + ".md")
+                if output_path.parent not in self._made_dirs:
+                    output_path.parent.mkdir(parents=True, exist_ok=True)
+                    self._made_dirs.add(output_path.parent)
+            else:
+                output_path = Path(self._output_dir_str, filename + ".md")
             
-            if filename.startswith('.') or file_path.is_dir():
+            if filename.startswith('.'):
+                return None
+            # One stat per file, shared by the size check and the cache key
+            st = file_path.stat()
+            if S_ISDIR(st.st_mode):
                 return None
             
-            file_hash = self.get_file_hash(file_path)
+            # Large files are keyed on metadata rather than read end to end just to find a cache hit
+            is_large, large_file_reason = self.is_large_file(file_path, st)
+            file_hash = self.get_weak_file_key(file_path, st) if is_large else self.get_file_hash(file_path, st)
             if self.get_from_cache(file_hash, output_path):
                 return output_path
             
-            logger.info(f"🔍 Processing new file: {filename}")
+            logger.debug("🔍 Processing new file: %s (Type: %s)", filename, file_type)
+            # The output may be a hardlink to a cache file; never rewrite that in place
+            output_path.unlink(missing_ok=True)
             
-            is_large, large_file_reason = self.is_large_file(file_path)
             if is_large:
                 logger.warning(f"⚠️ Large file detected: {filename} - {large_file_reason}")
             
-            # WARNING: Never use EMOJI dictionary here - hard-code emojis based on file type
-            file_emoji = {'pdf': '📑', 'text': '📝', 'word': '📄', 'excel': '📊', 'eml': '📧'}.get(file_type, '📄')
-            logger.info(f"{file_emoji} Processing: {filename} (Type: {file_type})")
-            
             success = False
             stats = {}
             
@@ -753,12 +1103,10 @@ class DocumentConverter:
                             except Exception:
                                 pass
                     else:
-                        with open(output_path, 'w') as f:
-                            f.write(f"# Conversion Error\n\nFailed to prepare `{filename}` for LLM processing.\n")
+                        output_path.write_text(LLM_PREPARE_FAILED_TEMPLATE.format(filename=filename))
                         success = False
                 else:
-                    with open(output_path, 'w') as f:
-                        f.write(f"# Unsupported File Type\n\n`{filename}` is not supported in LLM mode.\n")
+                    output_path.write_text(LLM_UNSUPPORTED_TEMPLATE.format(filename=filename))
                     success = False
             else:
                 if file_type in ['word', 'powerpoint']:
@@ -766,26 +1114,24 @@ class DocumentConverter:
                 elif file_type == 'excel':
                     output_files = self.process_excel_file(file_path, output_path.parent)
                     if output_files:
-                        with open(output_path, 'w') as f:
-                            f.write(f"# {filename}\n\n")
-                            f.write(f"This Excel file has been converted into {len(output_files)} separate markdown files:\n\n")
-                            for output_file in output_files:
-                                relative_name = output_file.name
-                                f.write(f"- [{relative_name}](./{relative_name})\n")
+                        links = ''.join(f"- [{output_file.name}](./{output_file.name})\n" for output_file in output_files)
+                        output_path.write_text(
+                            f"# {filename}\n\n"
+                            f"This Excel file has been converted into {len(output_files)} separate markdown files:\n\n"
+                            f"{links}"
+                        )
                         success = True
                     else:
                         success = False
                 elif file_type in ['pdf', 'image']:
-                    with open(output_path, 'w') as f:
-                        f.write(f"# {file_type.capitalize()} File\n\n`{filename}`\n\n**Note:** {file_type.capitalize()} content is not extracted in direct conversion mode.\n")
+                    output_path.write_text(NOT_EXTRACTED_TEMPLATE.format(kind=file_type.capitalize(), filename=filename))
                     success = True
                 else:
-                    with open(output_path, 'w') as f:
-                        f.write(f"# Unsupported File Type\n\n`{filename}` cannot be converted directly.\n")
+                    output_path.write_text(DIRECT_UNSUPPORTED_TEMPLATE.format(filename=filename))
                     success = False
 
             if success:
-                self.store_in_cache(file_hash, file_path, output_path, file_type, is_large, stats)
+                self.store_in_cache(file_hash, file_path, output_path, file_type, is_large, stats, weak_key=is_large)
             
             return output_path if success else None
             
@@ -794,9 +1140,70 @@ class DocumentConverter:
             logger.error(f"💥 [{get_thread_id()}] REGULAR_FILE_PROCESSING_ERROR: {file_path.name} | Exception: {exception_name} | Error: {e}")
             return None
     
+    def _process_file_in_thread(self, file_path: Path) -> Tuple[Optional[Path], Dict[str, CacheEntry], Dict[str, Dict[str, Any]], Dict[Path, Dict]]:
+        """Thread pool counterpart of _process_file_in_pool_worker; state is already shared, so nothing to ship back."""
+        return process_file_with_timeout(self.process_file, file_path), {}, {}, {}
+    
+    def _merge_worker_state(self, cache_entries: Dict[str, CacheEntry], hash_meta: Dict[str, Dict[str, Any]],
+                            eml_results: Dict[Path, Dict]) -> None:
+        """Fold cache entries, hash metadata and EML results produced by a pool worker into this converter."""
+        self.hash_meta.update(hash_meta)
+        self.eml_processing_results.update(eml_results)
+        if cache_entries:
+            self.cache.files.update({k: entry.hot() for k, entry in cache_entries.items()})
+            self._queue_cache_entries(cache_entries)
+    
+    def _iter_completed(self, submit_file, files: List[Path], file_types: Dict[Path, str],
+                        max_pending: int) -> Iterator[Tuple[Path, Future]]:
+        """
+        Submit files with timeout wrapper for complete isolation, keeping at most max_pending in flight,
+        and yield (file, future) as each one completes.
+        An EML directory is converted as a whole, so only its first file is submitted.
+        """
+        pending: Dict[Future, Path] = {}
+        submitted_eml_dirs = set()
+        remaining = iter(files)
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                f = next(remaining, None)
+                if f is None:
+                    exhausted = True
+                elif file_types[f] == 'eml' and f.parent in submitted_eml_dirs:
+                    future = Future()
+                    future.set_result((Path("_eml_already_processed_successfully"), {}, {}, {}))
+                    yield f, future
+                else:
+                    if file_types[f] == 'eml':
+                        submitted_eml_dirs.add(f.parent)
+                    pending[submit_file(f)] = f
+            if not pending:
+                return
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future
+    
+    def _iter_input_files(self, directory: Optional[Path] = None) -> Iterator[os.DirEntry]:
+        """Walk the input tree with os.scandir, skipping hidden entries and not following directory symlinks."""
+        with os.scandir(directory or self.input_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    yield from self._iter_input_files(entry.path)
+                elif entry.is_file():
+                    yield entry
+    
     def run(self) -> None:
         """Main entry point to run the converter on all files."""
         start_time = time.time()
+        
+        # Worker threads only enqueue log records; a listener thread does the formatting and terminal I/O
+        console_handlers = logger.handlers[:]
+        log_listener = logging.handlers.QueueListener(queue.SimpleQueue(), *console_handlers, respect_handler_level=True)
+        logger.handlers = [logging.handlers.QueueHandler(log_listener.queue)]
+        log_listener.start()
+        
         logger.info(f"🚀 Starting bulletproof document conversion process")
         logger.info(f"🔒 File processing timeout: {FILE_PROCESSING_TIMEOUT}s per file")
         logger.info(f"🔒 Thread isolation: {THREADS_FOR_LOCAL_OPS} parallel workers")
@@ -808,10 +1215,13 @@ class DocumentConverter:
         skipped_count = 0
         
         # Track statistics by file type
-        file_type_stats = {}  # {file_type: {'total': X, 'success': Y, 'failed': Z, 'failed_files': []}}
+        file_type_stats = {}  # {file_type: {'total': X, 'success': Y, 'failed': Z, 'failed_files': deque, 'failed_files_count': N}}
         
         try:
-            all_files = [f for f in self.input_dir.rglob('*') if f.is_file() and not f.name.startswith('.')] # Exclude hidden files
+            # Exclude hidden files and directories; file types are classified once here and reused below
+            file_types = self._file_type_cache = {Path(entry.path): file_type_for_suffix(os.path.splitext(entry.name)[1].lower())
+                          for entry in self._iter_input_files()}
+            all_files = list(file_types)
             if not all_files:
                 logger.warning(f"⚠️ No files found in {self.input_dir}")
                 with open(self.output_dir / "no_files_found.md", 'w') as f:
@@ -819,71 +1229,86 @@ class DocumentConverter:
                 logger.info(f"🎉 Process complete - no files to process")
                 return
             
-            # Pre-analyze file types for statistics
-            for file_path in all_files:
-                file_type = self.get_file_type(file_path)
-                if file_type not in file_type_stats:
-                    file_type_stats[file_type] = {'total': 0, 'success': 0, 'failed': 0, 'failed_files': []}
-                file_type_stats[file_type]['total'] += 1
+            # Pre-analyze file types for statistics (classification is a suffix lookup, so one counting pass)
+            for file_type, total in Counter(file_types.values()).items():
+                file_type_stats[file_type] = {'total': total, 'success': 0, 'failed': 0,
+                                              'failed_files': deque(maxlen=FAILED_FILES_KEPT), 'failed_files_count': 0}
             
             logger.info(f"Found {len(all_files)} files to process")
             file_types_summary = ', '.join([f'{k}({v["total"]})' for k, v in file_type_stats.items()])
             logger.info(f"File types: {file_types_summary}")
             logger.info(f"Starting parallel processing with bulletproof isolation...")
             
-            with ThreadPoolExecutor(max_workers=THREADS_FOR_LOCAL_OPS) as executor:
-                # Submit each file with timeout wrapper for complete isolation
-                future_to_file = {
-                    executor.submit(process_file_with_timeout, self.process_file, f): f 
-                    for f in all_files
-                }
-                
+            # Direct mode is CPU-bound (pandoc, pandas, hashing): run it in worker processes.
+            # LLM mode is I/O-bound: threads prepare files and wait while the API event loop does the network work.
+            pool_workers = API_CONCURRENCY if self.use_llm else THREADS_FOR_LOCAL_OPS
+            if self.use_llm or self.workers == "threads":
+                self._pool = ThreadPoolExecutor(max_workers=pool_workers)
+                submit_file = lambda f: self._pool.submit(self._process_file_in_thread, f)
+            else:
+                # forkserver: workers never inherit the parent's running threads (timeout pool, API loop) or their locks
+                start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else None
+                self._pool = ProcessPoolExecutor(
+                    max_workers=pool_workers,
+                    mp_context=multiprocessing.get_context(start_method),
+                    initializer=_init_pool_worker,
+                    initargs=(self.input_dir, self.output_dir, self.cache_dir, self.cache, self.hash_meta)
+                )
+                submit_file = lambda f: self._pool.submit(_process_file_in_pool_worker, f)
+            
+            with self._pool:
+                # Per-file log lines use %-style arguments so nothing is formatted unless the record is emitted
                 completed_count = 0
-                for future in concurrent.futures.as_completed(future_to_file):
+                total_files = len(all_files)
+                tid = get_thread_id()  # Results are always collected on this thread
+                for file, future in self._iter_completed(submit_file, all_files, file_types,
+                                                         pool_workers * PENDING_FILES_PER_WORKER):
                     completed_count += 1
-                    file = future_to_file[future]
                     
                     # Track file type for this specific file
-                    file_type = self.get_file_type(file)
+                    file_type = file_types[file]
                     
                     try:
-                        result = future.result()
+                        result, cache_entries, hash_meta, eml_results = future.result()
+                        self._merge_worker_state(cache_entries, hash_meta, eml_results)
                         if result:
                             successful_count += 1
                             file_type_stats[file_type]['success'] += 1
                             # Special logging for EML files
                             if file_type == 'eml':
                                 if "already_processed" in str(result):
-                                    logger.info(f"✅ [{get_thread_id()}] EML_BATCH_PROCESSED: {file.name} | Type: {file_type} | [{completed_count}/{len(all_files)}] (part of batch)")
+                                    logger.info("✅ [%s] EML_BATCH_PROCESSED: %s | Type: %s | [%d/%d] (part of batch)", tid, file.name, file_type, completed_count, total_files)
                                 else:
-                                    logger.info(f"✅ [{get_thread_id()}] EML_BATCH_SUCCESS: {file.name} | Type: {file_type} | [{completed_count}/{len(all_files)}] (batch completed)")
+                                    logger.info("✅ [%s] EML_BATCH_SUCCESS: %s | Type: %s | [%d/%d] (batch completed)", tid, file.name, file_type, completed_count, total_files)
                             else:
-                                logger.info(f"✅ [{get_thread_id()}] SUCCESS: {file.name} | Type: {file_type} | [{completed_count}/{len(all_files)}]")
+                                logger.info("✅ [%s] SUCCESS: %s | Type: %s | [%d/%d]", tid, file.name, file_type, completed_count, total_files)
                         else:
                             failed_count += 1
                             file_type_stats[file_type]['failed'] += 1
                             file_type_stats[file_type]['failed_files'].append(file.name)
+                            file_type_stats[file_type]['failed_files_count'] += 1
                             # Enhanced failure logging - try to get more context about what went wrong
-                            logger.error(f"🚨 [{get_thread_id()}] PROCESSING_FAILED: {file.name} | Type: {file_type} | [{completed_count}/{len(all_files)}] | Worker returned None - check error logs above for specific failure details")
+                            logger.error("🚨 [%s] PROCESSING_FAILED: %s | Type: %s | [%d/%d] | Worker returned None - check error logs above for specific failure details",
+                                         tid, file.name, file_type, completed_count, total_files)
                             
                             # Add extra context for EML files since they process multiple files
                             if file_type == 'eml':
-                                logger.error(f"💥 [{get_thread_id()}] EML_CONTEXT: {file.name} represents a directory of EML files - individual file failures may be logged separately above")
+                                logger.error("💥 [%s] EML_CONTEXT: %s represents a directory of EML files - individual file failures may be logged separately above", tid, file.name)
                             
                         # Progress updates every 5 files or at completion
-                        if completed_count % 5 == 0 or completed_count == len(all_files):
-                            progress_percent = (completed_count / len(all_files)) * 100
-                            logger.info(f"📊 Progress: {completed_count}/{len(all_files)} ({progress_percent:.1f}%) - ✅{successful_count} ❌{failed_count}")
+                        if (completed_count % 5 == 0 or completed_count == total_files) and logger.isEnabledFor(logging.INFO):
+                            progress_percent = (completed_count / total_files) * 100
+                            logger.info("📊 Progress: %d/%d (%.1f%%) - ✅%d ❌%d", completed_count, total_files, progress_percent, successful_count, failed_count)
                             
                     except Exception as e:
                         failed_count += 1
                         file_type_stats[file_type]['failed'] += 1
                         file_type_stats[file_type]['failed_files'].append(file.name)
+                        file_type_stats[file_type]['failed_files_count'] += 1
                         exception_name = type(e).__name__
-                        import traceback
-                        tb = traceback.format_exc()
-                        logger.error(f"💥 [{get_thread_id()}] ISOLATION_FAILURE: {file.name} | Type: {file_type} | Exception: {exception_name} | Error: {e} | [{completed_count}/{len(all_files)}]")
-                        logger.error(f"💥 [{get_thread_id()}] TRACEBACK for isolation failure {file.name}:\n{tb}")
+                        logger.error("💥 [%s] ISOLATION_FAILURE: %s | Type: %s | Exception: %s | Error: %s | [%d/%d]",
+                                     tid, file.name, file_type, exception_name, e, completed_count, total_files)
+                        logger.error("💥 [%s] TRACEBACK for isolation failure %s:", tid, file.name, exc_info=True)
                         # Continue processing other files regardless of this failure
 
             # Fix EML statistics using actual EML processing results
@@ -913,7 +1338,12 @@ class DocumentConverter:
                 # Update EML-specific stats to reflect actual processing
                 file_type_stats['eml']['success'] = eml_total_files if eml_failed_files == 0 else eml_successful_files
                 file_type_stats['eml']['failed'] = 0 if eml_failed_files == 0 else eml_failed_files
-                file_type_stats['eml']['failed_files'] = eml_failed_file_names if eml_failed_files > 0 else []
+                if eml_failed_files > 0:
+                    file_type_stats['eml']['failed_files'] = deque(eml_failed_file_names, maxlen=FAILED_FILES_KEPT)
+                    file_type_stats['eml']['failed_files_count'] = len(eml_failed_file_names)
+                else:
+                    file_type_stats['eml']['failed_files'].clear()
+                    file_type_stats['eml']['failed_files_count'] = 0
                 
                 logger.info(f"📧 EML Statistics Corrected: {eml_total_files} total EML files, {eml_successful_files} successful, {eml_failed_files} failed")
             
@@ -939,10 +1369,10 @@ class DocumentConverter:
                 
                 # Show up to 3 failed files per type for quick debugging
                 if stats['failed_files']:
-                    failed_examples = stats['failed_files'][:3]  # Show max 3 examples
+                    failed_examples = islice(stats['failed_files'], 3)  # Show max 3 examples
                     examples_str = ', '.join(failed_examples)
-                    if len(stats['failed_files']) > 3:
-                        examples_str += f" (+{len(stats['failed_files'])-3} more)"
+                    if stats['failed_files_count'] > 3:
+                        examples_str += f" (+{stats['failed_files_count']-3} more)"
                     logger.error(f"🚨 Failed {file_type} files: {examples_str}")
             
             logger.info(f"🔒 Conversion mode: {'LLM-based' if self.use_llm else 'Direct (pandoc)'}")
@@ -951,60 +1381,62 @@ class DocumentConverter:
             logger.info(f"📋 ===================================================")
             
             # Create detailed summary file
-            with open(self.output_dir / "_conversion_summary.md", 'w') as f:
-                f.write("# 📋 Bulletproof Document Conversion Summary\n\n")
-                f.write(f"**Conversion completed at:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-                f.write(f"## 📊 Statistics\n\n")
-                f.write(f"* 🕒 **Total processing time:** {elapsed_time:.2f} seconds\n")
-                f.write(f"* 📁 **Total files found:** {total_processed}\n")
-                f.write(f"* ✅ **Successfully processed:** {successful_count} ({success_rate:.1f}%)\n")
-                f.write(f"* ❌ **Failed processing:** {failed_count}\n\n")
-                
-                # Add file type breakdown table
-                f.write(f"## 📊 Processing Results by File Type\n\n")
-                f.write("| File Type | Total Files | ✅ Success | ❌ Failed | Success Rate |\n")
-                f.write("|-----------|-------------|------------|-----------|---------------|\n")
+            # Build the summary in memory and write it in one call
+            parts = []
+            parts.append("# 📋 Bulletproof Document Conversion Summary\n\n")
+            parts.append(f"**Conversion completed at:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+            parts.append(f"## 📊 Statistics\n\n")
+            parts.append(f"* 🕒 **Total processing time:** {elapsed_time:.2f} seconds\n")
+            parts.append(f"* 📁 **Total files found:** {total_processed}\n")
+            parts.append(f"* ✅ **Successfully processed:** {successful_count} ({success_rate:.1f}%)\n")
+            parts.append(f"* ❌ **Failed processing:** {failed_count}\n\n")
+            
+            # Add file type breakdown table
+            parts.append(f"## 📊 Processing Results by File Type\n\n")
+            parts.append("| File Type | Total Files | ✅ Success | ❌ Failed | Success Rate |\n")
+            parts.append("|-----------|-------------|------------|-----------|---------------|\n")
+            for file_type, stats in sorted(file_type_stats.items()):
+                type_success_rate = (stats['success'] / stats['total']) * 100 if stats['total'] > 0 else 0
+                parts.append(f"| **{file_type}** | {stats['total']} | {stats['success']} | {stats['failed']} | {type_success_rate:.1f}% |\n")
+            parts.append("\n")
+            
+            # Add failed files section for debugging
+            failed_files_exist = any(stats['failed_files'] for stats in file_type_stats.values())
+            if failed_files_exist:
+                parts.append("## 🚨 Failed Files by Type\n\n")
+                parts.append("*Files that failed processing (for debugging):*\n\n")
                 for file_type, stats in sorted(file_type_stats.items()):
-                    type_success_rate = (stats['success'] / stats['total']) * 100 if stats['total'] > 0 else 0
-                    f.write(f"| **{file_type}** | {stats['total']} | {stats['success']} | {stats['failed']} | {type_success_rate:.1f}% |\n")
-                f.write("\n")
-                
-                # Add failed files section for debugging
-                failed_files_exist = any(stats['failed_files'] for stats in file_type_stats.values())
-                if failed_files_exist:
-                    f.write("## 🚨 Failed Files by Type\n\n")
-                    f.write("*Files that failed processing (for debugging):*\n\n")
-                    for file_type, stats in sorted(file_type_stats.items()):
-                        if stats['failed_files']:
-                            f.write(f"### {file_type.capitalize()} Files ({len(stats['failed_files'])} failed)\n\n")
-                            for failed_file in stats['failed_files'][:10]:  # Show max 10 per type
-                                f.write(f"- `{failed_file}`\n")
-                            if len(stats['failed_files']) > 10:
-                                f.write(f"- *...and {len(stats['failed_files'])-10} more*\n")
-                            f.write("\n")
-                    f.write("\n")
-                
-                f.write(f"## ⚙️ Configuration\n\n")
-                f.write(f"* 🤖 **Conversion mode:** {'LLM-based (Google GenAI)' if self.use_llm else 'Direct conversion (pandoc)'}\n")
-                f.write(f"* ⏱️ **Timeout per file:** {FILE_PROCESSING_TIMEOUT} seconds\n")
-                f.write(f"* 🛡️ **Thread isolation:** Enabled\n")
-                f.write(f"* 🔧 **Parallel workers:** {THREADS_FOR_LOCAL_OPS}\n")
-                f.write(f"* 🔒 **Bulletproof mode:** Active (individual file failures isolated)\n\n")
-                if failed_count == 0:
-                    f.write("## 🎉 Perfect Success!\n\nAll files were processed successfully with no failures.\n")
-                elif success_rate >= 80:
-                    f.write("## ✅ Good Success Rate\n\nMost files processed successfully. Failed files are listed above for debugging.\n")
-                else:
-                    f.write("## ⚠️ Mixed Results\n\nSome files failed processing. Check failed files section above and use these commands to debug:\n\n")
-                    f.write("```bash\n")
-                    f.write("# Search for specific error types:\n")
-                    f.write("grep '🚨.*FAILED' logs.txt\n")
-                    f.write("grep '💥.*ISOLATION_FAILURE' logs.txt\n")
-                    f.write("\n# Filter by file type:\n")
-                    f.write("grep 'Type: eml' logs.txt\n")
-                    f.write("\n# Find specific exceptions:\n")
-                    f.write("grep 'Exception:' logs.txt\n")
-                    f.write("```\n")
+                    if stats['failed_files']:
+                        parts.append(f"### {file_type.capitalize()} Files ({stats['failed_files_count']} failed)\n\n")
+                        for failed_file in islice(stats['failed_files'], 10):  # Show max 10 per type
+                            parts.append(f"- `{failed_file}`\n")
+                        if stats['failed_files_count'] > 10:
+                            parts.append(f"- *...and {stats['failed_files_count']-10} more*\n")
+                        parts.append("\n")
+                parts.append("\n")
+            
+            parts.append(f"## ⚙️ Configuration\n\n")
+            parts.append(f"* 🤖 **Conversion mode:** {'LLM-based (Google GenAI)' if self.use_llm else 'Direct conversion (pandoc)'}\n")
+            parts.append(f"* ⏱️ **Timeout per file:** {FILE_PROCESSING_TIMEOUT} seconds\n")
+            parts.append(f"* 🛡️ **Thread isolation:** Enabled\n")
+            parts.append(f"* 🔧 **Parallel workers:** {THREADS_FOR_LOCAL_OPS}\n")
+            parts.append(f"* 🔒 **Bulletproof mode:** Active (individual file failures isolated)\n\n")
+            if failed_count == 0:
+                parts.append("## 🎉 Perfect Success!\n\nAll files were processed successfully with no failures.\n")
+            elif success_rate >= 80:
+                parts.append("## ✅ Good Success Rate\n\nMost files processed successfully. Failed files are listed above for debugging.\n")
+            else:
+                parts.append("## ⚠️ Mixed Results\n\nSome files failed processing. Check failed files section above and use these commands to debug:\n\n")
+                parts.append("```bash\n")
+                parts.append("# Search for specific error types:\n")
+                parts.append("grep '🚨.*FAILED' logs.txt\n")
+                parts.append("grep '💥.*ISOLATION_FAILURE' logs.txt\n")
+                parts.append("\n# Filter by file type:\n")
+                parts.append("grep 'Type: eml' logs.txt\n")
+                parts.append("\n# Find specific exceptions:\n")
+                parts.append("grep 'Exception:' logs.txt\n")
+                parts.append("```\n")
+            (self.output_dir / "_conversion_summary.md").write_text("".join(parts))
             
             # Final success message
             if successful_count == total_processed:
@@ -1018,6 +1450,14 @@ class DocumentConverter:
                 f.write(f"# ❌ Conversion Process Failed\n\n**Error:** {str(e)}\n")
             raise
         finally:
+            if self._api_loop is not None:
+                self._api_loop.call_soon_threadsafe(self._api_loop.stop)
+            # Record cache metadata and persist hash metadata gathered this run
+            try:
+                self._save_cache(self.cache)
+                self._cache_db.close()
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to save cache index: {e}")
             try:
                 for temp_file in self.temp_dir.glob("*"):
                     temp_file.unlink(missing_ok=True)
@@ -1025,6 +1465,35 @@ class DocumentConverter:
                 logger.debug(f"✅ Cleaned up temp directory")
             except Exception as e:
                 logger.warning(f"⚠️ Failed to clean up temp directory: {e}")
+            log_listener.stop()  # Drains queued records
+            logger.handlers = console_handlers
+
+
+# --- Process pool workers (direct mode) ---
+# Each worker process builds one DocumentConverter at startup and reuses it for every file it is given.
+_pool_converter: Optional[DocumentConverter] = None
+
+
+def _init_pool_worker(input_dir: Path, output_dir: Path, cache_dir: Path,
+                      cache: Cache, hash_meta: Dict[str, Dict[str, Any]]) -> None:
+    """ProcessPoolExecutor initializer: build this worker's converter from the parent's cache snapshot."""
+    global _pool_converter
+    _pool_converter = DocumentConverter.for_pool_worker(input_dir, output_dir, cache_dir, cache, hash_meta)
+
+
+def _process_file_in_pool_worker(file_path: Path) -> Tuple[Optional[Path], Dict[str, CacheEntry], Dict[str, Dict[str, Any]], Dict[Path, Dict]]:
+    """
+    Process one file in a worker process.
+    Returns (result, new cache entries, hash metadata, EML results) so the parent can merge the state.
+    """
+    converter = _pool_converter
+    result = process_file_with_timeout(converter.process_file, file_path)
+    
+    cache_entries, converter.unsaved_cache_entries = converter.unsaved_cache_entries, {}
+    meta_key = str(file_path)
+    hash_meta = {meta_key: converter.hash_meta[meta_key]} if meta_key in converter.hash_meta else {}
+    eml_results, converter.eml_processing_results = converter.eml_processing_results, {}
+    return result, cache_entries, hash_meta, eml_results
 
 
 def main():
@@ -1032,6 +1501,8 @@ def main():
     parser = argparse.ArgumentParser(description="Convert documents to Markdown.")
     parser.add_argument('--use-llm', action='store_true',
                         help='Use the LLM for conversion instead of the direct method.')
+    parser.add_argument('--workers', choices=['processes', 'threads'], default='processes',
+                        help='Direct mode worker pool: processes (default, CPU-bound converters) or threads.')
     args = parser.parse_args()
 
     api_key = None  # Default the API key to None
@@ -1046,7 +1517,7 @@ def main():
     cache_dir = Path(os.environ.get('CACHE_DIR', '/cache'))
 
     # Initialize the converter. It will now only receive an API key if --use-llm is active.
-    converter = DocumentConverter(api_key, input_dir, output_dir, cache_dir, use_llm=args.use_llm)
+    converter = DocumentConverter(api_key, input_dir, output_dir, cache_dir, use_llm=args.use_llm, workers=args.workers)
     converter.run()
 
 if __name__ == "__main__":
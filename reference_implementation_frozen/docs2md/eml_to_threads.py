@@ -2,12 +2,20 @@
 """
 Library to convert .eml files into organized Markdown conversation threads.
 
-VERSION: 3.5.0
+VERSION: 3.8.5
 🤖 AI AGENTS: INCREMENT VERSION NUMBER WHEN MODIFYING THIS FILE!
    - Major changes (breaking): X.0.0
    - New features: X.Y.0
    - Bug fixes/improvements: X.Y.Z
 
+v3.8.0: Thread files and attachments are written by a thread pool, one task each per directory.
+        3.8.3: the number of parse processes is a constructor argument (parse_workers).
+        3.8.4: parses are submitted to the pool through a bounded window, not all up front.
+v3.7.0: Attachments stay encoded until output; a repeated encoded payload is recognised by its
+        hash and skipped without being decoded again. Since 3.7.6 the hash is BLAKE3, or
+        SHA-256 when blake3 is not installed.
+v3.6.0: Directories with many .eml files are parsed in a process pool (mail-parser is CPU-bound);
+        workers send back only the parsed fields EmailMessage reads.
 v3.5.0: Enhanced HTML to plain text conversion using existing html2text library.
         Now properly extracts HTML email bodies and converts them to readable plain text.
         DESIGN DECISION: Inline images (Content-ID) are INTENTIONALLY IGNORED.
@@ -20,33 +28,179 @@ v3.0.0: Refactored to use the the 'mail-parser' library for robust, resilient pa
 
 import os
 import re
+import sys
 import base64
+import bisect
 import hashlib
 import logging
+import mimetypes
+import multiprocessing
 import threading
 import traceback
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain, islice
 from pathlib import Path
 from datetime import datetime, timezone
-from collections import defaultdict
-from typing import Dict, List, Optional, Tuple, Any
+from collections import defaultdict, deque
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional, Tuple, Any
+
+import html2text
 
 # Use the robust mail-parser library for all email parsing.
 # It gracefully handles malformed emails and provides defect reports.
 # Project URL: https://github.com/SpamScope/mail-parser
 import mailparser
 
+# Attachment dedup keys only live for one run, so any fast hash will do. BLAKE3 when installed
+# (as for convert.py's cache keys); otherwise SHA-256, which beats BLAKE2b on CPUs with SHA extensions.
+try:
+    from blake3 import blake3 as _dedup_hash
+except ImportError:
+    _dedup_hash = hashlib.sha256
+
 # Script version - AI agents must increment when modifying!
-EML_CONVERTER_VERSION = "3.5.0"
+EML_CONVERTER_VERSION = "3.8.5"
+
+# Reply/forward markers stripped from the start of a subject (compared lower-cased)
+_SUBJECT_PREFIXES = ('re:', 'fwd:', 'fw:')
+
+# Precompiled patterns for the per-email body and filename cleanup
+_RE_HTML_ROOT = re.compile(r'<html', re.IGNORECASE)
+_RE_FILENAME_BAD = re.compile(r'[<>:"/\\|?*]')
+_RE_SAFE_SUBJECT = re.compile(r'[^\w\s-]')
+_RE_SAFE_SEP = re.compile(r'[-\s]+')
+
+HTML_TAG_MAX_LEN = 256  # A '<' only counts as a tag if its '>' follows within this many characters
+HTML_SCAN_MAX_CHARS = 4 << 20  # Bodies larger than this are only checked for an <html> root element
+ATTACHMENT_WRITE_CHUNK = 1 << 20  # Attachments are written to disk in slices of this many bytes
+EML_PARSE_PROCESS_MIN_FILES = 32  # Directories with fewer .eml files are parsed in-process
+EML_PARSE_WORKERS = os.cpu_count() or 1  # Default parse processes; callers running several converters pass fewer
+EML_OUTPUT_WORKERS = min(32, EML_PARSE_WORKERS * 4)  # Threads writing thread files and attachments (I/O-bound)
+
+# The parts of a mailparser.MailParser that EmailMessage reads; all plain, picklable values
+_PARSED_MAIL_FIELDS = ('message_id', 'subject', 'from_', 'to', 'date', 'references', 'in_reply_to',
+                       'text_plain', 'text_html', 'body', 'attachments', 'defects')
 
 # Set up thread-safe logger for library use
 logger = logging.getLogger(__name__)
+_LOG_LEVELS = {'debug': logging.DEBUG, 'info': logging.INFO, 'warning': logging.WARNING,
+               'error': logging.ERROR, 'critical': logging.CRITICAL}
 
 def log_with_thread_info(level: str, message: str) -> None:
     """Log message with thread information for bulletproof logging."""
-    thread_id = threading.current_thread().ident or 0
-    thread_name = threading.current_thread().name
-    log_msg = f"[{thread_name}:{thread_id}] {message}"
-    getattr(logger, level.lower())(log_msg)
+    level_no = _LOG_LEVELS[level.lower()]
+    if not logger.isEnabledFor(level_no):
+        return  # Filtered out: skip the prefix formatting and the handler lock entirely
+    current = threading.current_thread()
+    logger.log(level_no, f"[{current.name}:{current.ident or 0}] {message}")
+
+def _iter_eml_files(root: Path) -> Iterator[Path]:
+    """
+    Yield the .eml files under root in sorted path order, like sorted(root.rglob('*.eml')),
+    but lazily: each directory is scanned and sorted on its own as the walk reaches it.
+    """
+    def scan(directory: str) -> Iterator[os.DirEntry]:
+        try:
+            with os.scandir(directory) as it:
+                return iter(sorted(it, key=lambda entry: entry.name))
+        except OSError as e:
+            log_with_thread_info('warning', f"Could not scan directory {directory}: {e}")
+            return iter(())
+
+    stack = [scan(str(root))]
+    while stack:
+        entry = next(stack[-1], None)
+        if entry is None:
+            stack.pop()
+        elif entry.is_dir(follow_symlinks=False):
+            stack.append(scan(entry.path))
+        elif entry.name.endswith('.eml') and entry.is_file():
+            yield Path(entry.path)
+
+def _parse_one_eml(path_str: str, detach: bool = False) -> Tuple[Any, Optional[Exception], Optional[str]]:
+    """
+    Parse one .eml file with mail-parser. Returns (parsed_mail, None, None) or (None, exception, traceback_text).
+    With detach=True (process pool workers) only the fields EmailMessage reads are returned, as a SimpleNamespace.
+    Top-level so it can be pickled by ProcessPoolExecutor.
+    """
+    try:
+        # Use mail-parser, which is designed to be resilient.
+        # See: https://github.com/SpamScope/mail-parser#usage
+        parsed_mail = mailparser.parse_from_file(path_str)
+        if detach:
+            parsed_mail = SimpleNamespace(**{name: getattr(parsed_mail, name) for name in _PARSED_MAIL_FIELDS})
+        return parsed_mail, None, None
+    except Exception as e:
+        return None, e, traceback.format_exc()
+
+def _iter_parsed_in_pool(pool: Executor, eml_files: Iterator[Path],
+                         max_pending: int) -> Iterator[Tuple[Path, Tuple[Any, Optional[Exception], Optional[str]]]]:
+    """
+    Parse .eml files on a process pool, keeping at most max_pending in flight, and yield
+    (path, _parse_one_eml result) in input order. The walk is only advanced as results are consumed.
+    """
+    pending = deque()
+    for eml_file in eml_files:
+        if len(pending) >= max_pending:
+            done_file, future = pending.popleft()
+            yield done_file, future.result()
+        pending.append((eml_file, pool.submit(_parse_one_eml, str(eml_file), detach=True)))
+    while pending:
+        done_file, future = pending.popleft()
+        yield done_file, future.result()
+
+def _payload_bytes(payload: Any) -> bytes:
+    """
+    Return an attachment payload as bytes. Strings are encoded as Latin-1 where possible, which
+    maps code points 0-255 straight back to bytes, and fall back to UTF-8 for real text.
+    """
+    if isinstance(payload, bytes):
+        return payload
+    try:
+        return payload.encode('latin-1')
+    except UnicodeEncodeError:
+        return payload.encode('utf-8', errors='replace')
+
+def _hash_payload(payload: Any, new_hasher: Any) -> str:
+    """
+    Hex digest of an attachment payload. String payloads are encoded and fed to the hasher
+    ATTACHMENT_WRITE_CHUNK characters at a time, so no full-size bytes copy is made.
+    """
+    hasher = new_hasher()
+    if isinstance(payload, str):
+        for offset in range(0, len(payload), ATTACHMENT_WRITE_CHUNK):
+            hasher.update(_payload_bytes(payload[offset:offset + ATTACHMENT_WRITE_CHUNK]))
+    else:
+        hasher.update(payload)
+    return hasher.hexdigest()
+
+def _decode_attachment_payload(filename: str, payload: Any, is_base64: bool) -> bytes:
+    """Decode an attachment payload as returned by EmailMessage._extract_attachments."""
+    if not is_base64:
+        return _payload_bytes(payload)
+    try:
+        return base64.b64decode(payload.encode('ascii') if isinstance(payload, str) else payload)
+    except (ValueError, TypeError) as e:
+        log_with_thread_info('warning', f"Could not decode attachment '{filename}': {e}. Using raw payload.")
+        return _payload_bytes(payload)
+
+@lru_cache(maxsize=256)
+def _ext_for(content_type: str) -> str:
+    """File extension for a MIME type ('.bin' if unknown); cached, as mailboxes repeat a handful of types."""
+    return mimetypes.guess_extension(content_type) or '.bin'
+
+def _html_to_text(html_content: str) -> str:
+    """
+    Convert an HTML body to Markdown-flavoured plain text with the email converter's html2text settings.
+    A fresh HTML2Text is built per body: the parser keeps tag state (e.g. inside an unclosed <style>)
+    across handle() calls, so a shared instance would let one malformed email blank out the next.
+    """
+    h = html2text.HTML2Text()
+    h.ignore_links = False
+    h.body_width = 0  # Don't wrap lines
+    return h.handle(html_content)
 
 class EmailMessage:
     """
@@ -61,8 +215,10 @@ class EmailMessage:
         # Core properties are now accessed directly from the parsed object.
         self.message_id = self.mail.message_id or f"<generated-{eml_file_path.stem}>"
         self.subject = self._clean_subject(self.mail.subject or '')
-        self.from_addr = self._format_address(self.mail.from_)
-        self.to_addr = self._format_address(self.mail.to)
+        self._subject_lc = self.subject.lower()  # Threading key for the subject fallback
+        # Interned: the same senders recur across a thread, so the participants set compares by identity
+        self.from_addr = sys.intern(self._format_address(self.mail.from_))
+        self.to_addr = sys.intern(self._format_address(self.mail.to))
         self.date = self._normalize_date(self.mail.date)
         self.references = self.mail.references
         self.in_reply_to = self.mail.in_reply_to
@@ -74,13 +230,11 @@ class EmailMessage:
         if not addresses:
             return "Unknown"
         
-        formatted_addrs = []
-        for name, addr in addresses:
-            if name:
-                formatted_addrs.append(f"{name} <{addr}>")
-            else:
-                formatted_addrs.append(addr)
-        return ', '.join(formatted_addrs)
+        # Most headers carry a single address: format it directly, without a list and join
+        if len(addresses) == 1:
+            name, addr = addresses[0]
+            return f"{name} <{addr}>" if name else addr
+        return ', '.join([f"{name} <{addr}>" if name else addr for name, addr in addresses])
 
     def _normalize_date(self, date_obj: Optional[datetime]) -> datetime:
         """
@@ -101,9 +255,14 @@ class EmailMessage:
         """Clean subject line by removing Re:, Fwd: prefixes."""
         if not subject:
             return "No Subject"
-        cleaned = re.sub(r'^(Re|Fwd?|Fw):\s*', '', subject, flags=re.IGNORECASE)
-        cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-        return cleaned or "No Subject"
+        # One leading prefix is dropped, then str.split() collapses whitespace runs and trims the
+        # ends (it splits on the same Unicode whitespace as \s); no regex engine pass needed
+        head = subject[:4].lower()
+        for prefix in _SUBJECT_PREFIXES:
+            if head.startswith(prefix):
+                subject = subject[len(prefix):]
+                break
+        return ' '.join(subject.split()) or "No Subject"
 
     def _extract_email_body(self) -> str:
         """Extract email body, preferring plain text, converting HTML only when necessary."""
@@ -115,14 +274,8 @@ class EmailMessage:
         # 2. FALLBACK CASE: Only HTML exists - convert to plain text
         elif self.mail.text_html:
             try:
-                import html2text
-                h = html2text.HTML2Text()
-                h.ignore_links = False
-                h.body_width = 0  # Don't wrap lines
-                
                 html_content = '\n'.join(self.mail.text_html)
-                converted = h.handle(html_content)
-                return converted
+                return _html_to_text(html_content)
             except Exception as e:
                 log_with_thread_info('warning', f"HTML conversion failed for {self.source_filename}: {e}. Using raw HTML.")
                 return '\n'.join(self.mail.text_html)
@@ -132,12 +285,7 @@ class EmailMessage:
             # Check if it looks like HTML
             if self._is_html_content(self.mail.body):
                 try:
-                    import html2text
-                    h = html2text.HTML2Text()
-                    h.ignore_links = False
-                    h.body_width = 0
-                    converted = h.handle(self.mail.body)
-                    return converted
+                    return _html_to_text(self.mail.body)
                 except Exception as e:
                     log_with_thread_info('warning', f"Generic HTML conversion failed for {self.source_filename}: {e}. Using raw content.")
                     return self.mail.body
@@ -147,13 +295,22 @@ class EmailMessage:
         return "No message body found."
 
     def _is_html_content(self, content: str) -> bool:
-        """Simple check if content contains HTML tags."""
-        import re
-        # Look for HTML tags
-        html_pattern = r'<[^>]+>'
-        return bool(re.search(html_pattern, content))
-
-    def _extract_attachments(self) -> List[Tuple[str, bytes, str]]:
+        """
+        Simple check if content contains HTML tags: a '<' followed by a letter, '/' or '!',
+        closed by a '>' within HTML_TAG_MAX_LEN characters. Linear in the body length,
+        unlike an unbounded '<[^>]+>' search that rescans to the end for every unclosed '<'.
+        """
+        if len(content) > HTML_SCAN_MAX_CHARS:
+            return bool(_RE_HTML_ROOT.search(content))
+        i = content.find('<')
+        while i != -1 and i < len(content) - 1:
+            c = content[i + 1]
+            if (c.isalpha() or c == '/' or c == '!') and content.find('>', i + 1, i + HTML_TAG_MAX_LEN) != -1:
+                return True
+            i = content.find('<', i + 1)
+        return False
+
+    def _extract_attachments(self) -> List[Tuple[str, Any, str, bool]]:
         """
         Extracts both standard and inline attachments from email messages.
 
@@ -164,6 +321,9 @@ class EmailMessage:
         It sanitizes filenames to remove invalid characters, which is crucial
         for inline attachments where the filename might be derived from a
         Content-ID like "<image123>".
+
+        Payloads are returned still encoded, as (filename, payload, content_type, is_base64);
+        they are decoded with _decode_attachment_payload only once deduplication has missed.
         """
         attachments = []
         
@@ -177,59 +337,57 @@ class EmailMessage:
             if not filename and content_id:
                 # Sanitize Content-ID to be a valid filename
                 # e.g., "<red_pixel>" -> "red_pixel"
-                sanitized_cid = re.sub(r'[<>:"/\\|?*]', '', content_id)
+                sanitized_cid = _RE_FILENAME_BAD.sub('', content_id)
                 
                 # Attempt to guess extension from MIME type
-                import mimetypes
-                extension = mimetypes.guess_extension(content_type) or '.bin'
+                extension = _ext_for(content_type)
                 filename = f"{sanitized_cid}{extension}"
 
             if not filename:
                 # Fallback for attachments with no filename or Content-ID
-                import mimetypes
-                extension = mimetypes.guess_extension(content_type) or '.bin'
+                extension = _ext_for(content_type)
                 # Create a unique but deterministic name
-                payload_hash = hashlib.sha1(payload.encode('utf-8', errors='replace') if isinstance(payload, str) else payload).hexdigest()[:8]
+                payload_hash = _hash_payload(payload, hashlib.sha1)[:8]
                 filename = f"attachment_{payload_hash}{extension}"
-                log_with_thread_info('warning', f"Attachment has no filename or Content-ID. Generated filename: {filename}")
+                log_with_thread_info('debug', f"Attachment has no filename or Content-ID. Generated filename: {filename}")
 
             # Sanitize the final filename regardless of its origin
-            filename = re.sub(r'[<>:"/\\|?*]', '', filename)
+            filename = _RE_FILENAME_BAD.sub('', filename)
 
             if not payload:
                 log_with_thread_info('warning', f"Skipping attachment '{filename}' due to empty payload.")
                 continue
 
-            decoded_payload = b''
-            try:
-                if isinstance(payload, str):
-                    decoded_payload = base64.b64decode(payload.encode('ascii'))
-                elif isinstance(payload, bytes):
-                    decoded_payload = base64.b64decode(payload)
-            except (ValueError, TypeError) as e:
-                log_with_thread_info('warning', f"Could not decode attachment '{filename}': {e}. Using raw payload.")
-                decoded_payload = payload.encode('utf-8', errors='replace') if isinstance(payload, str) else payload
-
-            attachments.append((filename, decoded_payload, content_type))
+            # mail-parser hands over base64 text for binary parts (binary=True); other payloads
+            # (e.g. attached multipart messages) are already the content and are not base64-decoded
+            transfer_encoding = (att.get('content_transfer_encoding') or '').lower()
+            is_base64 = transfer_encoding == 'base64' or (not transfer_encoding and att.get('binary', True))
+            attachments.append((filename, payload, content_type, bool(is_base64)))
             
         return attachments
 
     def remove_quoted_text(self) -> str:
         """Remove quoted text from email content."""
         # mail-parser does a good job of this, but we can add more cleaning if needed.
+        # Deliberately not stripping '>' lines: html2text renders <blockquote> that way, and for a
+        # single-email thread the quoted history may be the only copy of the earlier messages.
         return self.content
 
 class EmailThread:
     """Represents a conversation thread containing multiple emails."""
     def __init__(self, subject: str):
         self.subject = subject
-        self.emails: List[EmailMessage] = []
+        self.emails: List[EmailMessage] = []  # Newest first
+        self._sort_keys: List[float] = []  # -timestamp of each entry in self.emails, ascending
         self.source_filenames: List[str] = []  # Track original EML filenames
 
     def add_email(self, email_msg: EmailMessage):
-        """Add an email to this thread."""
-        self.emails.append(email_msg)
-        self.emails.sort(key=lambda x: x.date, reverse=True)
+        """Add an email to this thread, keeping the emails newest first."""
+        # bisect_right keeps emails with equal dates in arrival order, like the stable sort it replaces
+        sort_key = -email_msg.date.timestamp()
+        idx = bisect.bisect_right(self._sort_keys, sort_key)
+        self._sort_keys.insert(idx, sort_key)
+        self.emails.insert(idx, email_msg)
         # Track source filenames for traceability
         if email_msg.source_filename not in self.source_filenames:
             self.source_filenames.append(email_msg.source_filename)
@@ -244,14 +402,14 @@ class EmailThread:
             return f"{base_name}.thread.md"
         
         # For multi-email threads, use subject-based naming with source file info
-        safe_subject = re.sub(r'[^\w\s-]', '', self.subject).strip()
-        safe_subject = re.sub(r'[-\s]+', '_', safe_subject).lower()[:60] or "untitled"  # Shortened for space
+        safe_subject = _RE_SAFE_SUBJECT.sub('', self.subject).strip()
+        safe_subject = _RE_SAFE_SEP.sub('_', safe_subject).lower()[:60] or "untitled"  # Shortened for space
         
         # Add source file indicator for multi-email threads
         source_indicator = f"_from_{len(self.source_filenames)}_files"
         
         if self.emails:
-            oldest_email = min(self.emails, key=lambda x: x.date)
+            oldest_email = self.emails[-1]  # Kept newest first by add_email
             date_str = oldest_email.date.strftime("%Y%m%d")
             return f"{date_str}_{safe_subject}{source_indicator}.thread.md"
         
@@ -262,9 +420,14 @@ class AttachmentManager:
     def __init__(self, output_dir: Path):
         self.output_dir = output_dir
         self.attachment_hashes: Dict[str, str] = {}
+        self.raw_hashes: Dict[str, str] = {}  # Hash of the still-encoded payload -> final filename
+
+    def has_raw_hash(self, raw_hash: str) -> Optional[str]:
+        """Return the filename already saved for this encoded payload, if any."""
+        return self.raw_hashes.get(raw_hash)
 
-    def save_attachment(self, filename: str, content: Any) -> str:
-        """Save attachment and return the final filename used."""
+    def save_attachment(self, filename: str, content: Any, raw_hash: Optional[str] = None) -> str:
+        """Save attachment and return the final filename used. raw_hash, if given, is remembered for has_raw_hash."""
         if not content:
             log_with_thread_info('warning', f"Skipping zero-byte attachment: {filename}")
             return filename
@@ -275,23 +438,40 @@ class AttachmentManager:
         else:
             content_bytes = content
 
-        # Use SHA256 to create a unique hash for deduplication.
-        # See: https://docs.python.org/3/library/hashlib.html#hashlib.sha256
-        content_hash = hashlib.sha256(content_bytes).hexdigest()
+        # Hash the content to deduplicate attachments saved from this directory
+        content_hash = _dedup_hash(content_bytes).hexdigest()
         if content_hash in self.attachment_hashes:
-            return self.attachment_hashes[content_hash]
+            final_filename = self.attachment_hashes[content_hash]
+            if raw_hash:
+                self.raw_hashes[raw_hash] = final_filename
+            return final_filename
 
         file_path = self.output_dir / filename
         counter = 1
         base, ext = os.path.splitext(filename)
-        while file_path.exists():
-            file_path = self.output_dir / f"{base}_{counter}{ext}"
-            counter += 1
-
         try:
-            file_path.write_bytes(content_bytes)
+            # Exclusive create picks the first free name in one syscall per candidate (no exists() race)
+            while True:
+                try:
+                    fh = open(file_path, 'xb')
+                    break
+                except FileExistsError:
+                    file_path = self.output_dir / f"{base}_{counter}{ext}"
+                    counter += 1
+            with fh:
+                try:
+                    # Slices of a memoryview share the payload buffer, so large attachments reach the
+                    # kernel ATTACHMENT_WRITE_CHUNK bytes at a time without copying
+                    view = memoryview(content_bytes)
+                    for offset in range(0, len(view), ATTACHMENT_WRITE_CHUNK):
+                        fh.write(view[offset:offset + ATTACHMENT_WRITE_CHUNK])
+                except BaseException:
+                    file_path.unlink(missing_ok=True)  # Don't leave a truncated attachment behind
+                    raise
             final_filename = file_path.name
             self.attachment_hashes[content_hash] = final_filename
+            if raw_hash:
+                self.raw_hashes[raw_hash] = final_filename
             return final_filename
         except Exception as e:
             log_with_thread_info('error', f"Failed to save attachment {filename}: {e}")
@@ -299,9 +479,10 @@ class AttachmentManager:
 
 class EmlToThreadsConverter:
     """Orchestrates the conversion of .eml files to Markdown threads."""
-    def __init__(self, input_path: Path, output_path: Path):
+    def __init__(self, input_path: Path, output_path: Path, parse_workers: int = EML_PARSE_WORKERS):
         self.input_path = input_path
         self.output_path = output_path
+        self.parse_workers = parse_workers
         self.threads_by_path: Dict[Path, Dict[str, EmailThread]] = {}
         self.failures: List[Dict[str, Any]] = []
 
@@ -333,48 +514,76 @@ class EmlToThreadsConverter:
         and logging any defects found for graceful degradation.
         """
         emails = []
-        eml_files = sorted(self.input_path.rglob('*.eml'))
-        total_files = len(eml_files)
-
-        for eml_file in eml_files:
-            try:
-                # Use mail-parser, which is designed to be resilient.
-                # See: https://github.com/SpamScope/mail-parser#usage
-                parsed_mail = mailparser.parse_from_file(str(eml_file))
-                
-                # GRACEFUL DEGRADATION: Check for and log any parsing defects.
-                if parsed_mail.defects:
-                    log_with_thread_info('warning', f"🟡 File '{eml_file.name}' has defects, but was partially parsed:")
-                    for defect in parsed_mail.defects:
-                        defect_name = defect.get('name', 'Unknown Defect')
-                        defect_details = defect.get('details', 'No details')
-                        log_with_thread_info('warning', f"  - Defect: {defect_name} ({defect_details})")
-                
-                # Even with defects, we create an EmailMessage to extract what we can.
-                email_msg = EmailMessage(parsed_mail, eml_file)
-                emails.append(email_msg)
+        total_files = 0
+        # Only the first EML_PARSE_PROCESS_MIN_FILES paths are needed up front, to pick in-process or pool
+        eml_iter = _iter_eml_files(self.input_path)
+        head = list(islice(eml_iter, EML_PARSE_PROCESS_MIN_FILES))
+        eml_files = chain(head, eml_iter)
+
+        # mail-parser is CPU-bound: fan large directories out to worker processes (forkserver, since
+        # callers may be running threads); small ones are not worth the pool start-up
+        pool = None
+        if len(head) >= EML_PARSE_PROCESS_MIN_FILES and self.parse_workers > 1:
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else None
+            pool = ProcessPoolExecutor(max_workers=self.parse_workers,
+                                       mp_context=multiprocessing.get_context(start_method))
+            parse_results = _iter_parsed_in_pool(pool, eml_files, max_pending=2 * self.parse_workers)
+        else:
+            parse_results = ((eml_file, _parse_one_eml(str(eml_file))) for eml_file in eml_files)
 
-            except Exception as e:
-                # This will now only catch catastrophic failures where mail-parser itself fails.
-                log_with_thread_info('error', f"🔴 Catastrophic failure on file '{eml_file.name}': {e}")
-                log_with_thread_info('error', traceback.format_exc())
-                self.failures.append({"file": str(eml_file.relative_to(self.input_path.parent)), "error": str(e), "exception": type(e).__name__, "traceback": traceback.format_exc()})
-                
-                # Create an error markdown file for this specific failure
-                error_filename = f"{eml_file.stem}_conversion_error.md"
-                error_filepath = self.output_path / eml_file.relative_to(self.input_path).parent / error_filename
-                error_filepath.parent.mkdir(parents=True, exist_ok=True)
-                with open(error_filepath, 'w', encoding='utf-8') as f:
-                    f.write(f"# 🔴 EML Conversion Failure\n\n")
-                    f.write(f"**File:** `{eml_file.name}`\n\n")
-                    f.write(f"**Error:** A catastrophic failure occurred during parsing that could not be gracefully handled.\n\n")
-                    f.write("### Exception Details\n\n")
-                    f.write(f"**Type:** `{type(e).__name__}`\n\n")
-                    f.write(f"**Message:**\n```\n{e}\n```\n\n")
-                    f.write(f"**Traceback:**\n```\n{traceback.format_exc()}\n```\n")
+        try:
+            for eml_file, (parsed_mail, error, error_tb) in parse_results:
+                total_files += 1
+                if error is not None:
+                    self._record_parse_failure(eml_file, error, error_tb)
+                    continue
+                try:
+                    self._add_parsed_email(emails, parsed_mail, eml_file)
+                except Exception as e:
+                    self._record_parse_failure(eml_file, e, traceback.format_exc())
+        except BaseException:
+            # Don't wait for the parses still queued behind a failure
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            raise
+        else:
+            if pool is not None:
+                pool.shutdown()
         
         return emails, total_files
 
+    def _add_parsed_email(self, emails: List[EmailMessage], parsed_mail: Any, eml_file: Path) -> None:
+        """Log any parsing defects and wrap the parsed mail in an EmailMessage."""
+        # GRACEFUL DEGRADATION: Check for and log any parsing defects.
+        if parsed_mail.defects and logger.isEnabledFor(logging.WARNING):
+            log_with_thread_info('warning', f"🟡 File '{eml_file.name}' has defects, but was partially parsed:")
+            for defect in parsed_mail.defects:
+                defect_name = defect.get('name', 'Unknown Defect')
+                defect_details = defect.get('details', 'No details')
+                log_with_thread_info('warning', f"  - Defect: {defect_name} ({defect_details})")
+        
+        # Even with defects, we create an EmailMessage to extract what we can.
+        emails.append(EmailMessage(parsed_mail, eml_file))
+
+    def _record_parse_failure(self, eml_file: Path, e: Exception, error_tb: str) -> None:
+        """Record a catastrophic parse failure (mail-parser itself failed) and write an error file for it."""
+        log_with_thread_info('error', f"🔴 Catastrophic failure on file '{eml_file.name}': {e}")
+        log_with_thread_info('error', error_tb)
+        self.failures.append({"file": str(eml_file.relative_to(self.input_path.parent)), "error": str(e), "exception": type(e).__name__, "traceback": error_tb})
+        
+        # Create an error markdown file for this specific failure
+        error_filename = f"{eml_file.stem}_conversion_error.md"
+        error_filepath = self.output_path / eml_file.relative_to(self.input_path).parent / error_filename
+        error_filepath.parent.mkdir(parents=True, exist_ok=True)
+        with open(error_filepath, 'w', encoding='utf-8') as f:
+            f.write(f"# 🔴 EML Conversion Failure\n\n")
+            f.write(f"**File:** `{eml_file.name}`\n\n")
+            f.write(f"**Error:** A catastrophic failure occurred during parsing that could not be gracefully handled.\n\n")
+            f.write("### Exception Details\n\n")
+            f.write(f"**Type:** `{type(e).__name__}`\n\n")
+            f.write(f"**Message:**\n```\n{e}\n```\n\n")
+            f.write(f"**Traceback:**\n```\n{error_tb}\n```\n")
+
     def _build_threads(self, emails: List[EmailMessage]):
         """Group emails into conversation threads."""
         emails_by_dir = defaultdict(list)
@@ -383,19 +592,32 @@ class EmlToThreadsConverter:
             emails_by_dir[relative_dir].append(email_msg)
         
         for email_dir, dir_emails in emails_by_dir.items():
-            message_id_to_email = {email_msg.message_id: email_msg for email_msg in dir_emails}
-            self.threads_by_path[email_dir] = {}
+            # One email per folder is common in archive dumps: it can only start its own thread
+            if len(dir_emails) == 1:
+                email_msg = dir_emails[0]
+                thread = EmailThread(email_msg.subject)
+                thread.add_email(email_msg)
+                self.threads_by_path[email_dir] = {email_msg.message_id: thread}
+                continue
+            
+            thread_map: Dict[str, EmailThread] = {}
+            self.threads_by_path[email_dir] = thread_map
+            # Inverted indexes over the threads built so far: message-id -> thread id of the email
+            # carrying it, and lower-cased thread subject -> thread id of the first such thread
+            msgid_to_tid: Dict[str, str] = {}
+            subject_to_tid: Dict[str, str] = {}
             
             for email_msg in dir_emails:
-                thread_id = self._find_or_create_thread(email_msg, message_id_to_email, email_dir)
-                if thread_id not in self.threads_by_path[email_dir]:
-                    self.threads_by_path[email_dir][thread_id] = EmailThread(email_msg.subject)
-                self.threads_by_path[email_dir][thread_id].add_email(email_msg)
-
-    def _find_or_create_thread(self, email_msg: EmailMessage, message_id_map: Dict[str, EmailMessage], email_dir: Path) -> str:
+                thread_id = self._find_or_create_thread(email_msg, msgid_to_tid, subject_to_tid)
+                thread = thread_map.get(thread_id)
+                if thread is None:
+                    thread = thread_map[thread_id] = EmailThread(email_msg.subject)
+                    subject_to_tid.setdefault(email_msg._subject_lc, thread_id)
+                thread.add_email(email_msg)
+                msgid_to_tid.setdefault(email_msg.message_id, thread_id)
+
+    def _find_or_create_thread(self, email_msg: EmailMessage, msgid_to_tid: Dict[str, str], subject_to_tid: Dict[str, str]) -> str:
         """Find existing thread or create new one for this email."""
-        thread_map = self.threads_by_path.get(email_dir, {})
-
         # Ensure references is always a list to handle malformed headers
         references = email_msg.references or []
         if isinstance(references, str):
@@ -403,67 +625,90 @@ class EmlToThreadsConverter:
             
         search_ids = [email_msg.in_reply_to] + references
         for msg_id in filter(None, search_ids):
-            if msg_id in message_id_map:
-                for tid, thread in thread_map.items():
-                    if any(e.message_id == msg_id for e in thread.emails):
-                        return tid
-        
-        for tid, thread in thread_map.items():
-            if thread.subject.lower() == email_msg.subject.lower():
+            tid = msgid_to_tid.get(msg_id)
+            if tid is not None:
                 return tid
         
+        tid = subject_to_tid.get(email_msg._subject_lc)
+        if tid is not None:
+            return tid
+        
         return email_msg.message_id
 
     def _generate_output(self):
-        """Generate thread files and extract attachments."""
-        for email_dir, threads in self.threads_by_path.items():
-            output_subdir = self.output_path / email_dir
-            output_subdir.mkdir(parents=True, exist_ok=True)
-            attachment_manager = AttachmentManager(output_subdir)
-            
-            for thread in threads.values():
+        """
+        Generate thread files and extract attachments. Per directory, the thread files and the
+        attachments are written by two pool tasks, so Markdown assembly overlaps attachment I/O.
+        Each task runs in thread order, which keeps attachment names (a.png, a_1.png, ...) and
+        dedup decisions deterministic without sharing an AttachmentManager between threads.
+        """
+        def write_threads(threads: List[EmailThread], output_subdir: Path) -> None:
+            for thread in threads:
                 self._write_thread_file(thread, output_subdir)
+
+        def extract_attachments(threads: List[EmailThread], attachment_manager: AttachmentManager) -> None:
+            for thread in threads:
                 self._extract_thread_attachments(thread, attachment_manager)
 
+        with ThreadPoolExecutor(max_workers=EML_OUTPUT_WORKERS) as pool:
+            futures = []
+            for email_dir, threads in self.threads_by_path.items():
+                output_subdir = self.output_path / email_dir
+                output_subdir.mkdir(parents=True, exist_ok=True)
+                dir_threads = list(threads.values())
+                futures.append(pool.submit(write_threads, dir_threads, output_subdir))
+                futures.append(pool.submit(extract_attachments, dir_threads, AttachmentManager(output_subdir)))
+            for future in futures:
+                future.result()
+
     def _write_thread_file(self, thread: EmailThread, output_dir: Path):
         """Write a single thread to a Markdown file."""
         file_path = output_dir / thread.get_thread_filename()
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(f"# {thread.subject}\n\n")
-                participants = {e.from_addr for e in thread.emails if e.from_addr}
-                f.write(f"**Participants:** {len(participants)}\n")
-                f.write(f"**Emails:** {len(thread.emails)}\n")
-                
-                # Add source file traceability information
-                if thread.source_filenames:
-                    f.write(f"**Source Files:** {', '.join(thread.source_filenames)}\n")
+            email_count = len(thread.emails)
+            participants = {e.from_addr for e in thread.emails if e.from_addr}
+            parts = [f"# {thread.subject}\n\n",
+                     f"**Participants:** {len(participants)}\n",
+                     f"**Emails:** {email_count}\n"]
+            
+            # Add source file traceability information
+            if thread.source_filenames:
+                parts.append(f"**Source Files:** {', '.join(thread.source_filenames)}\n")
+            
+            parts.append("\n---\n\n")
+            
+            for i, email_msg in enumerate(thread.emails):
+                parts.append(f"## Email {i+1} of {email_count}\n\n"
+                             f"**From:** {email_msg.from_addr or 'Unknown'}\n"
+                             f"**To:** {email_msg.to_addr or 'Unknown'}\n"
+                             f"**Date:** {email_msg.date.strftime('%Y-%m-%d %H:%M')}\n\n")
                 
-                f.write(f"\n---\n\n")
+                content = email_msg.content  # remove_quoted_text() is the identity; skip the call
+                if content:
+                    parts.append("### Message\n\n")
+                    parts.append(content)
+                else:
+                    parts.append("*No message body found.*")
                 
-                for i, email_msg in enumerate(thread.emails):
-                    f.write(f"## Email {i+1} of {len(thread.emails)}\n\n")
-                    f.write(f"**From:** {email_msg.from_addr or 'Unknown'}\n")
-                    f.write(f"**To:** {email_msg.to_addr or 'Unknown'}\n")
-                    f.write(f"**Date:** {email_msg.date.strftime('%Y-%m-%d %H:%M')}\n\n")
-                    
-                    content = email_msg.remove_quoted_text()
-                    if content:
-                        f.write("### Message\n\n")
-                        f.write(content)
-                    else:
-                        f.write("*No message body found.*")
-                    
-                    if i < len(thread.emails) - 1:
-                        f.write("\n\n---\n\n")
+                if i < email_count - 1:
+                    parts.append("\n\n---\n\n")
+            
+            # Assemble the thread in memory and hand it to the OS in one write
+            file_path.write_text(''.join(parts), encoding='utf-8')
         except Exception as e:
             log_with_thread_info('error', f"💥 THREAD_FILE_WRITE_FAILED: {file_path} | {e}")
 
     def _extract_thread_attachments(self, thread: EmailThread, attachment_manager: AttachmentManager):
         """Extract all attachments from a thread."""
         for email_msg in thread.emails:
-            for filename, content, _ in email_msg.attachments:
+            for filename, payload, _, is_base64 in email_msg.attachments:
                 try:
-                    attachment_manager.save_attachment(filename, content)
+                    # The same attachment forwarded through a thread arrives with the same encoded payload:
+                    # recognise it from a hash of that payload before paying for the base64 decode
+                    raw_hash = ('b64:' if is_base64 else 'raw:') + _hash_payload(payload, _dedup_hash)
+                    if attachment_manager.has_raw_hash(raw_hash):
+                        continue
+                    content = _decode_attachment_payload(filename, payload, is_base64)
+                    attachment_manager.save_attachment(filename, content, raw_hash)
                 except Exception as e:
                     log_with_thread_info('warning', f"💥 ATTACHMENT_SAVE_FAILED: {filename} | {e}")
\ No newline at end of file
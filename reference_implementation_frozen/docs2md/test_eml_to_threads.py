@@ -1,51 +1,101 @@
+import os
+import shutil
 import unittest
 import tempfile
 import base64
 import mailparser
+from dataclasses import dataclass, field
 from pathlib import Path
 from datetime import datetime, timezone
-from unittest.mock import MagicMock, patch
+from typing import Any, List, Optional
+from unittest.mock import patch
 
 from eml_to_threads import EmlToThreadsConverter, EmailMessage
 
+# Attachment payloads as mail-parser hands them over (base64 text), encoded once at import
+_B64_IMAGE = base64.b64encode(b'imagedata').decode('ascii')
+_B64_ICS = base64.b64encode(b'BEGIN:VCALENDAR...').decode('ascii')
+_B64_DOCX = base64.b64encode(b'word document data').decode('ascii')
+_B64_PDF = base64.b64encode(b'pdfdata').decode('ascii')
+
+_SHM_DIR = '/dev/shm'  # Linux tmpfs mount; the tests fall back to the default temp dir without it
+
+def _fast_touch(path):
+    """Create an empty file; unlike Path.touch() it skips the utime() call the tests don't need."""
+    os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+
+@dataclass(slots=True)
+class FakeMail:
+    """Stand-in for a parsed mailparser.MailParser exposing only the attributes EmailMessage reads."""
+    subject: str
+    date: Optional[datetime]
+    references: Any
+    in_reply_to: Optional[str]
+    message_id: str
+    body: str
+    attachments: List[dict] = field(default_factory=list)
+    defects: List[dict] = field(default_factory=list)
+    from_: List[tuple] = field(default_factory=list)
+    to: List[tuple] = field(default_factory=list)
+    text_plain: List[str] = field(default_factory=list)
+    text_html: List[str] = field(default_factory=list)
+
 class TestEmlToThreads(unittest.TestCase):
 
-    def setUp(self):
-        self.temp_dir = tempfile.TemporaryDirectory()
-        self.input_path = Path(self.temp_dir.name) / "input"
-        self.output_path = Path(self.temp_dir.name) / "output"
-        self.input_path.mkdir()
-        self.output_path.mkdir()
+    @classmethod
+    def setUpClass(cls):
+        # One temp tree for the class, in RAM (tmpfs) where available; setUp empties it between tests
+        tmp_root = _SHM_DIR if os.path.isdir(_SHM_DIR) and os.access(_SHM_DIR, os.W_OK) else None
+        cls.temp_dir = tempfile.TemporaryDirectory(dir=tmp_root)
+        cls.input_path = Path(cls.temp_dir.name) / "input"
+        cls.output_path = Path(cls.temp_dir.name) / "output"
+        cls.input_path.mkdir()
+        cls.output_path.mkdir()
+        # mail-parser is patched once for the whole class; setUp resets the mock between tests
+        cls._patcher = patch('eml_to_threads.mailparser.parse_from_file')
+        cls.mock_parse = cls._patcher.start()
+        cls.addClassCleanup(cls._patcher.stop)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
 
-    def tearDown(self):
-        self.temp_dir.cleanup()
+    def setUp(self):
+        self.mock_parse.reset_mock(return_value=True, side_effect=True)
+        for directory in (self.input_path, self.output_path):
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        shutil.rmtree(entry.path)
+                    else:
+                        os.unlink(entry.path)
 
     def _create_mock_email(self, subject, date, references, in_reply_to, message_id, filename, body=None, defects=None, attachments=None):
         """Creates a mock email object and saves a dummy .eml file."""
-        mock_mail = MagicMock()
-        mock_mail.subject = subject
-        mock_mail.date = date
-        mock_mail.references = references
-        mock_mail.in_reply_to = in_reply_to
-        mock_mail.message_id = message_id
-        mock_mail.body = body or f"This is a test email: {subject}"
-        mock_mail.attachments = attachments or []
-        mock_mail.defects = defects or []
+        mock_mail = FakeMail(
+            subject=subject,
+            date=date,
+            references=references,
+            in_reply_to=in_reply_to,
+            message_id=message_id,
+            body=body or f"This is a test email: {subject}",
+            attachments=attachments or [],
+            defects=defects or [],
+        )
         
         eml_path = self.input_path / filename
-        eml_path.touch()
+        _fast_touch(eml_path)
         
         return mock_mail, eml_path
 
     # --- Existing Tests ---
 
-    @patch('eml_to_threads.mailparser.parse_from_file')
-    def test_references_as_string_and_date_normalization(self, mock_parse):
+    def test_references_as_string_and_date_normalization(self):
         """Handles 'references' as a string and normalizes mixed-timezone dates."""
         mock_mail_1, path_1 = self._create_mock_email("Test Thread", datetime(2023, 1, 1, 10, 0, 0), [], None, "<id_1@example.com>", "email1.eml")
         mock_mail_2, path_2 = self._create_mock_email("Re: Test Thread", datetime(2023, 1, 1, 11, 0, 0, tzinfo=timezone.utc), "<id_1@example.com>", "<id_1@example.com>", "<id_2@example.com>", "email2.eml")
         
-        mock_parse.side_effect = lambda fp: {str(path_1): mock_mail_1, str(path_2): mock_mail_2}.get(fp)
+        self.mock_parse.side_effect = {str(path_1): mock_mail_1, str(path_2): mock_mail_2}.__getitem__
 
         converter = EmlToThreadsConverter(self.input_path, self.output_path)
         result = converter.convert()
@@ -55,27 +105,32 @@ class TestEmlToThreads(unittest.TestCase):
         self.assertEqual(len(thread.emails), 2)
         self.assertIsNotNone(thread.emails[1].date.tzinfo)
 
-    @patch('eml_to_threads.mailparser.parse_from_file')
-    def test_multiple_distinct_threads(self, mock_parse):
+    def test_multiple_distinct_threads(self):
         """Tests that two separate conversations are sorted into two threads."""
         mock_mail_A1, path_A1 = self._create_mock_email("Thread A", datetime.now(timezone.utc), [], None, "<A1>", "A1.eml")
         mock_mail_A2, path_A2 = self._create_mock_email("Re: Thread A", datetime.now(timezone.utc), ["<A1>"], "<A1>", "<A2>", "A2.eml")
         mock_mail_B1, path_B1 = self._create_mock_email("Thread B", datetime.now(timezone.utc), [], None, "<B1>", "B1.eml")
         
-        mock_parse.side_effect = lambda fp: {str(path_A1): mock_mail_A1, str(path_A2): mock_mail_A2, str(path_B1): mock_mail_B1}.get(fp)
+        self.mock_parse.side_effect = {str(path_A1): mock_mail_A1, str(path_A2): mock_mail_A2, str(path_B1): mock_mail_B1}.__getitem__
 
         converter = EmlToThreadsConverter(self.input_path, self.output_path)
         result = converter.convert()
 
         self.assertEqual(result['threads_created'], 2)
 
-    @patch('eml_to_threads.mailparser.parse_from_file')
-    def test_graceful_failure_on_parsing_error(self, mock_parse):
+    def test_graceful_failure_on_parsing_error(self):
         """Ensures one failed parse does not stop the processing of other valid emails."""
         mock_mail_ok, path_ok = self._create_mock_email("Good Email", datetime.now(timezone.utc), [], None, "<ok>", "ok.eml")
-        path_bad = self.input_path / "bad.eml"; path_bad.touch()
+        path_bad = self.input_path / "bad.eml"; _fast_touch(path_bad)
 
-        mock_parse.side_effect = lambda fp: mock_mail_ok if fp == str(path_ok) else (_ for _ in ()).throw(ValueError("Test Failure"))
+        ok_path = str(path_ok)
+
+        def parse(fp):
+            if fp == ok_path:
+                return mock_mail_ok
+            raise ValueError("Test Failure")
+
+        self.mock_parse.side_effect = parse
 
         converter = EmlToThreadsConverter(self.input_path, self.output_path)
         result = converter.convert()
@@ -86,95 +141,58 @@ class TestEmlToThreads(unittest.TestCase):
 
     # --- New Outlook & Corporate Corner Case Tests ---
 
-    @patch('eml_to_threads.mailparser.parse_from_file')
-    def test_html_email_with_embedded_images(self, mock_parse):
-        """Ensures HTML body is extracted and embedded images are saved."""
-        html_body = "<html><body><p>Hello World</p><img src='cid:logo.png'></body></html>"
-        attachments = [{
-            'filename': 'logo.png',
-            'payload': base64.b64encode(b'imagedata').decode('ascii'),
-            'mail_content_type': 'image/png'
-        }]
-        mock_mail, path = self._create_mock_email("HTML Email", datetime.now(timezone.utc), [], None, "<html1>", "html.eml", body=html_body, attachments=attachments)
-        mock_parse.return_value = mock_mail
+    # Attachment corner cases, all run through one converter: (subject, message_id, .eml name,
+    # attachment filename, payload, content type, HTML body or None, expected saved bytes or None if skipped)
+    ATTACHMENT_CASES = [
+        # HTML body with an embedded image: the body is extracted and the image saved
+        ("HTML Email", "<html1>", "html.eml", "logo.png", _B64_IMAGE, "image/png",
+         "<html><body><p>Hello World</p><img src='cid:logo.png'></body></html>", b'imagedata'),
+        # .ics calendar invites are saved as attachments
+        ("Meeting", "<ics1>", "invite.eml", "invite.ics", _B64_ICS, "text/calendar", None, b'BEGIN:VCALENDAR...'),
+        # A file mail-parser extracted from a TNEF (winmail.dat) attachment; we mock the *result* of that process
+        ("From Outlook", "<tnef1>", "outlook.eml", "document.docx", _B64_DOCX,
+         "application/vnd.openxmlformats-officedocument.wordprocessingml.document", None, b'word document data'),
+        # Non-ASCII and special characters in the filename
+        ("Special Chars", "<special1>", "special.eml", "résumé_für_das_jahr_2023-01-01 (final).pdf", _B64_PDF,
+         "application/pdf", None, b'pdfdata'),
+        # A zero-byte attachment is skipped and does not cause an error
+        ("Empty File", "<empty1>", "empty.eml", "empty.txt", "", "text/plain", None, None),
+    ]
+
+    def test_attachment_variants(self):
+        """Saves (or skips) each kind of attachment in ATTACHMENT_CASES from a single conversion."""
+        parse_map = {}
+        for subject, message_id, eml_name, filename, payload, content_type, body, _ in self.ATTACHMENT_CASES:
+            attachments = [{'filename': filename, 'payload': payload, 'mail_content_type': content_type}]
+            mock_mail, path = self._create_mock_email(subject, datetime.now(timezone.utc), [], None, message_id, eml_name, body=body, attachments=attachments)
+            parse_map[str(path)] = mock_mail
+        self.mock_parse.side_effect = parse_map.__getitem__
 
         converter = EmlToThreadsConverter(self.input_path, self.output_path)
-        converter.convert()
-
-        self.assertTrue((self.output_path / "logo.png").exists())
-        self.assertTrue((self.output_path / "logo.png").read_bytes() == b'imagedata')
-
-    @patch('eml_to_threads.mailparser.parse_from_file')
-    def test_calendar_invite_attachment(self, mock_parse):
-        """Ensures .ics calendar invites are saved as attachments."""
-        attachments = [{
-            'filename': 'invite.ics',
-            'payload': base64.b64encode(b'BEGIN:VCALENDAR...').decode('ascii'),
-            'mail_content_type': 'text/calendar'
-        }]
-        mock_mail, path = self._create_mock_email("Meeting", datetime.now(timezone.utc), [], None, "<ics1>", "invite.eml", attachments=attachments)
-        mock_parse.return_value = mock_mail
-
-        converter = EmlToThreadsConverter(self.input_path, self.output_path)
-        converter.convert()
-
-        self.assertTrue((self.output_path / "invite.ics").exists())
-
-    @patch('eml_to_threads.mailparser.parse_from_file')
-    def test_winmail_dat_extraction(self, mock_parse):
-        """Simulates mail-parser extracting files from a TNEF (winmail.dat) attachment."""
-        # mail-parser handles this internally. We mock the *result* of that process.
-        attachments = [{
-            'filename': 'document.docx',
-            'payload': base64.b64encode(b'word document data').decode('ascii'),
-            'mail_content_type': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        }]
-        mock_mail, path = self._create_mock_email("From Outlook", datetime.now(timezone.utc), [], None, "<tnef1>", "outlook.eml", attachments=attachments)
-        mock_parse.return_value = mock_mail
-
-        converter = EmlToThreadsConverter(self.input_path, self.output_path)
-        converter.convert()
-
-        self.assertTrue((self.output_path / "document.docx").exists())
-
-    @patch('eml_to_threads.mailparser.parse_from_file')
-    def test_attachment_with_special_characters_in_filename(self, mock_parse):
-        """Tests saving attachments with non-ASCII and special filenames."""
-        filename = "résumé_für_das_jahr_2023-01-01 (final).pdf"
-        attachments = [{'filename': filename, 'payload': base64.b64encode(b'pdfdata').decode('ascii'), 'mail_content_type': 'application/pdf'}]
-        mock_mail, path = self._create_mock_email("Special Chars", datetime.now(timezone.utc), [], None, "<special1>", "special.eml", attachments=attachments)
-        mock_parse.return_value = mock_mail
-
-        converter = EmlToThreadsConverter(self.input_path, self.output_path)
-        converter.convert()
-
-        self.assertTrue((self.output_path / filename).exists(), "File with special characters should be saved correctly.")
+        result = converter.convert()
 
-    @patch('eml_to_threads.mailparser.parse_from_file')
-    def test_subject_only_threading(self, mock_parse):
+        self.assertEqual(result['successful_files'], len(self.ATTACHMENT_CASES))
+        for case in self.ATTACHMENT_CASES:
+            filename, expected = case[3], case[7]
+            with self.subTest(attachment=filename):
+                saved = self.output_path / filename
+                if expected is None:
+                    self.assertFalse(saved.exists(), "Zero-byte attachment should not be saved.")
+                else:
+                    self.assertTrue(saved.exists(), "Attachment should be saved under its own (sanitized) filename.")
+                    self.assertEqual(saved.read_bytes(), expected)
+
+    def test_subject_only_threading(self):
         """Tests that emails with same subject but no threading headers are grouped."""
         mock1, path1 = self._create_mock_email("Important Announcement", datetime(2023, 1, 5, 10, 0, 0, tzinfo=timezone.utc), [], None, "<subj1>", "subj1.eml")
         mock2, path2 = self._create_mock_email("Important Announcement", datetime(2023, 1, 5, 11, 0, 0, tzinfo=timezone.utc), [], None, "<subj2>", "subj2.eml")
         
-        mock_parse.side_effect = lambda fp: {str(path1): mock1, str(path2): mock2}.get(fp)
+        self.mock_parse.side_effect = {str(path1): mock1, str(path2): mock2}.__getitem__
 
         converter = EmlToThreadsConverter(self.input_path, self.output_path)
         result = converter.convert()
 
         self.assertEqual(result['threads_created'], 1, "Should form one thread based on subject.")
 
-    @patch('eml_to_threads.mailparser.parse_from_file')
-    def test_zero_byte_attachment(self, mock_parse):
-        """Ensures a zero-byte attachment is skipped and does not cause an error."""
-        attachments = [{'filename': 'empty.txt', 'payload': '', 'mail_content_type': 'text/plain'}]
-        mock_mail, path = self._create_mock_email("Empty File", datetime.now(timezone.utc), [], None, "<empty1>", "empty.eml", attachments=attachments)
-        mock_parse.return_value = mock_mail
-
-        converter = EmlToThreadsConverter(self.input_path, self.output_path)
-        result = converter.convert()
-
-        self.assertEqual(result['successful_files'], 1)
-        self.assertFalse((self.output_path / "empty.txt").exists(), "Zero-byte attachment should not be saved.")
-
 if __name__ == '__main__':
     unittest.main()
@@ -13,7 +13,7 @@ from email.mime.image import MIMEImage
 from email.utils import formatdate, make_msgid
 from datetime import datetime, timezone
 
-from eml_to_threads import EmlToThreadsConverter
+from eml_to_threads import EML_PARSE_PROCESS_MIN_FILES, EmlToThreadsConverter
 
 class TestEmlIntegration(unittest.TestCase):
     """Integration tests for EML to threads conversion focusing on basic functionality and failure modes."""
@@ -345,6 +345,47 @@ class TestEmlIntegration(unittest.TestCase):
         self.assertGreaterEqual(result['successful_files'], num_emails * 0.8)  # 80% success minimum
         self.assertGreaterEqual(result['threads_created'], num_threads - 1)  # Allow some variance
 
+    def test_process_pool_parsing_matches_in_process(self):
+        """Test that a directory large enough for the parse pool converts exactly as it does in-process."""
+        num_emails = EML_PARSE_PROCESS_MIN_FILES + 8
+        num_threads = 4
+        
+        thread_msg_ids = [[] for _ in range(num_threads)]
+        for email_idx in range(num_emails):
+            thread_idx = email_idx % num_threads
+            msg_id = make_msgid()
+            references = ' '.join(thread_msg_ids[thread_idx]) or None
+            thread_msg_ids[thread_idx].append(msg_id)
+            self._create_eml_file(
+                filename=f"pool_{email_idx:03d}.eml",
+                subject=f"Re: Pool Topic {thread_idx}" if references else f"Pool Topic {thread_idx}",
+                from_addr=f"sender{email_idx}@pool.com",
+                to_addr="list@pool.com",
+                msg_id=msg_id,
+                body=f"Pool email {email_idx} in thread {thread_idx}.",
+                references=references
+            )
+        with open(self.input_path / "pool_broken.eml", 'wb') as f:
+            # Dated, so its output does not depend on when each conversion ran
+            f.write(b"Subject: Broken\nFrom: test@\nDate: Mon, 2 Jan 2023 10:00:00 +0000\n\n\x00\xff")
+        
+        results = {}
+        outputs = {}
+        for parse_workers in (1, 2):
+            output_path = self.output_path / f"workers_{parse_workers}"
+            converter = EmlToThreadsConverter(self.input_path, output_path, parse_workers=parse_workers)
+            results[parse_workers] = converter.convert()
+            outputs[parse_workers] = {
+                path.relative_to(output_path): path.read_bytes()
+                for path in output_path.rglob('*') if path.is_file()
+            }
+        
+        self.assertEqual(results[2]['total_files'], num_emails + 1)
+        self.assertEqual(results[2]['threads_created'], results[1]['threads_created'])
+        self.assertGreaterEqual(results[2]['threads_created'], num_threads)
+        self.assertEqual(results[2]['successful_files'], results[1]['successful_files'])
+        self.assertEqual(outputs[2], outputs[1])
+
     def test_complex_attachment_scenarios(self):
         """Test various complex attachment scenarios."""
         # Large binary attachment